@@ -12,6 +12,8 @@ class ADBManager:
     def __init__(self):
         self.platform = "windows"
         self.adb_dir = "platform-tools"
+        # 测速和下载共用同一个会话，复用已建立的 TCP/TLS 连接
+        self.session = requests.Session()
         
     def get_download_url(self) -> str:
         """获取可用的 ADB 下载链接（国内镜像）"""
@@ -36,7 +38,7 @@ class ADBManager:
         for mirror in mirrors:
             try:
                 print(f"正在测试镜像源: {mirror[:50]}...")
-                response = requests.head(mirror, timeout=5)
+                response = self.session.head(mirror, timeout=5)
                 if response.status_code == 200:
                     print(f"找到可用镜像源: {mirror}")
                     return mirror
@@ -69,7 +71,7 @@ class ADBManager:
             print(f"下载链接: {url}")
             
             # 下载ZIP文件
-            response = requests.get(url, stream=True, timeout=30)
+            response = self.session.get(url, stream=True, timeout=30)
             response.raise_for_status()
             
             # 定义临时ZIP文件路径
@@ -77,9 +79,9 @@ class ADBManager:
             total_size = int(response.headers.get('content-length', 0))
             downloaded = 0
             
-            # 下载文件
+            # 下载文件（1 MiB 分块，减少循环和写入次数）
             with open(zip_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+                for chunk in response.iter_content(chunk_size=1 << 20):
                     if chunk:
                         f.write(chunk)
                         downloaded += len(chunk)
@@ -131,30 +133,12 @@ class ADBManager:
                 shutil.rmtree(temp_extract_dir, ignore_errors=True)
                 return False
 
-            # 5. 准备目标目录
+            # 5. 删除旧的目标目录
             if os.path.exists(target_base_dir):
                 shutil.rmtree(target_base_dir)
-            os.makedirs(target_base_dir, exist_ok=True)
-
-            # 6. 将找到的文件和目录移动到目标位置
-            # 如果找到的源目录就是临时目录本身，则移动其所有内容
-            if source_dir_to_move == temp_extract_dir:
-                for item in os.listdir(temp_extract_dir):
-                    s = os.path.join(temp_extract_dir, item)
-                    d = os.path.join(target_base_dir, item)
-                    if os.path.isdir(s):
-                        shutil.move(s, d)
-                    else:
-                        shutil.copy2(s, d)
-            else:
-                # 否则，移动找到的目录下的所有内容
-                for item in os.listdir(source_dir_to_move):
-                    s = os.path.join(source_dir_to_move, item)
-                    d = os.path.join(target_base_dir, item)
-                    if os.path.isdir(s):
-                        shutil.move(s, d)
-                    else:
-                        shutil.copy2(s, d)
+
+            # 6. 同一磁盘内直接重命名整个目录，无需逐个移动或复制文件
+            os.rename(source_dir_to_move, target_base_dir)
 
             # 7. 清理临时目录
             shutil.rmtree(temp_extract_dir, ignore_errors=True)
@@ -8,31 +8,60 @@ import os
 import json
 import shutil
 import socket
+import stat
 import threading
 import time
 from datetime import datetime
 from pathlib import Path
 import mimetypes
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 import webbrowser
-import zipfile
 import hashlib
+import re
 import qrcode
 from io import BytesIO
+from email.parser import HeaderParser
 import base64
+import functools
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
+import sys
 import tempfile
+import uuid
+import gzip
+import mmap
+import queue
 
-def show_qrcode_as_image(url, filepath=None):
-    """
-    生成二维码图片，并尝试用系统默认程序打开。
-    
-    Args:
-        url: 要编码的网址
-        filepath: 图片保存路径（可选，默认保存在临时目录）
-    """
-    # 1. 生成二维码
+try:
+    # Brotli 压缩率比 gzip 更高，未安装时只提供 gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    # orjson 序列化和解析速度远快于标准库 json，且直接返回/接受 bytes
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+    _loads = json.loads
+
+try:
+    # watchdog 可以发现其他程序对共享目录的修改，未安装时只通知本程序自己的修改
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+
+@functools.lru_cache(maxsize=8)
+def _render_qr_png(url) -> bytes:
+    """生成网址对应的二维码PNG数据，同一网址只渲染一次"""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -43,23 +72,42 @@ def show_qrcode_as_image(url, filepath=None):
     qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def show_qrcode_as_image(url, filepath=None):
+    """
+    生成二维码图片，并尝试用系统默认程序打开。
     
-    # 2. 保存图片
-    if filepath is None:
-        # 保存到临时文件
-        temp_dir = tempfile.gettempdir()
-        filepath = os.path.join(temp_dir, "flowlink_qrcode.png")
+    Args:
+        url: 要编码的网址
+        filepath: 图片保存路径（可选，默认保存在临时目录）
+    """
+    cached = filepath is None
+    if cached:
+        # 临时目录里的图片按网址命名，网址没变时重启直接复用上次生成的图片
+        key = hashlib.blake2b(url.encode('utf-8'), digest_size=8).hexdigest()
+        filepath = os.path.join(tempfile.gettempdir(), f"flowlink_qr_{key}.png")
     
-    img.save(filepath)
+    # 1. 生成并保存二维码
+    if not (cached and os.path.isfile(filepath)):
+        # 先写临时文件再改名，中途退出也不会留下残缺的缓存图片
+        with open(filepath + '.tmp', 'wb') as f:
+            f.write(_render_qr_png(url))
+        os.replace(filepath + '.tmp', filepath)
     print(f"✓ 二维码已生成: {filepath}")
     print(f"链接: {url}")
     
-    # 3. 尝试用系统默认程序打开图片
+    # 2. 尝试用系统默认程序打开图片
     try:
-        if os.name == 'nt':  # Windows
+        if os.name == 'nt':  # Windows，startfile 本身不会阻塞
             os.startfile(filepath)
-        elif os.name == 'posix':  # macOS 或 Linux
-            subprocess.run(['open', filepath] if sys.platform == 'darwin' else ['xdg-open', filepath], check=False)
+        elif os.name == 'posix':  # macOS 或 Linux，启动查看器后不等待它退出
+            opener = ['open'] if sys.platform == 'darwin' else ['xdg-open']
+            subprocess.Popen(opener + [filepath], stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, close_fds=True)
         print("已尝试自动打开二维码图片，请用手机扫描。")
     except Exception as e:
         print(f"无法自动打开图片，请手动查看: {filepath}")
@@ -68,123 +116,449 @@ def show_qrcode_as_image(url, filepath=None):
 
 desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
 
-class FileTransferServer(BaseHTTPRequestHandler):
-    """HTTP请求处理器，提供文件传输接口"""
+# 存储目录，启动服务器时创建一次
+BASE_DIR = Path(desktop_path) / "FilePasser"
+UPLOADS_DIR = BASE_DIR / "uploads"
+SHARED_DIR = BASE_DIR / "shared"
+DOWNLOADS_DIR = BASE_DIR / "downloads"
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 上传时每次从套接字读取的字节数
+SOCKET_SNDBUF = 4 << 20  # 套接字发送缓冲区大小
+SOCKET_RCVBUF = 4 << 20  # 套接字接收缓冲区大小
+PREALLOCATE_MIN = 1 << 20  # 小于此大小的上传不预分配空间
+# 同时处理的请求数上限（空闲的保持连接不占名额），下限留够几台设备同时上传下载
+SERVER_WORKERS = max(32, (os.cpu_count() or 1) * 4)
+SLOT_WAIT_TIMEOUT = 10  # 请求等待处理名额的最长时间（秒），超时返回503
+KEEPALIVE_TIMEOUT = 30  # 连接空闲超时（秒）
+EVENTS_PING_INTERVAL = 15  # 事件流没有通知时发送心跳的间隔（秒），用于发现已断开的页面
+# 同时打开的事件流上限；事件流不占处理名额，超过上限的页面退回定时刷新
+MAX_EVENT_SUBSCRIBERS = 64
+# 上传临时文件的打开方式（Windows 上必须指定二进制模式）
+_UPLOAD_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+# 下载时不跟随符号链接，共享目录里的链接不能把请求带到目录外面
+_DOWNLOAD_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0)
+# 分块上传的各块由不同连接并行写入同一个文件，不能截断
+_CHUNK_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+UPLOAD_CHUNK_MAX = 64 << 20  # 分块上传时单块的大小上限
+CHUNKED_UPLOAD_TIMEOUT = 600.0  # 分块上传超过这么久（秒）没有新的块就放弃，删除临时文件
+_UPLOAD_ID_RE = re.compile(r'[0-9A-Za-z_-]{8,64}$')
+
+_CORS_HEADERS = (b'Access-Control-Allow-Origin: *\r\n'
+                 b'Access-Control-Allow-Methods: GET, POST, OPTIONS, DELETE\r\n'
+                 b'Access-Control-Allow-Headers: Content-Type\r\n')
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+# 前端依赖：static 目录下有本地副本时通过 /assets/ 提供（离线局域网也能用），否则使用CDN。
+# 本地路径带版本号，因此可以让浏览器长期缓存
+STATIC_DIR = Path(__file__).parent / 'static'
+_ASSETS = {
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css':
+        'font-awesome/6.0.0/css/all.min.css',
+}
+
+
+def _use_local_assets(html):
+    """把页面中的CDN地址替换为已存在的本地资源地址"""
+    for cdn_url, local_path in _ASSETS.items():
+        if (STATIC_DIR / local_path).is_file():
+            html = html.replace(cdn_url, '/assets/' + local_path)
+    return html
+
+# 常见扩展名的MIME类型，查不到时再交给 mimetypes
+_MIME = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.mp4': 'video/mp4',
+    '.zip': 'application/zip',
+    '.pdf': 'application/pdf',
+    '.txt': 'text/plain; charset=utf-8',
+}
+
+
+def guess_content_type(name):
+    """根据文件名推断Content-Type"""
+    ext = os.path.splitext(name)[1].lower()
+    return _MIME.get(ext) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def _map_file(path):
+    """只读映射文件内容（关闭文件后映射仍然有效）；空文件无法映射，返回 b''"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _load_static_files(root):
+    """
+    启动时把 static 目录下的文件全部映射到内存，请求时只需查表。
+    返回 {请求路径: (内容, .gz预压缩内容或None, Content-Type, ETag)}
+    """
+    if not root.is_dir():
+        return {}
+    contents = {'/' + p.relative_to(root).as_posix(): _map_file(p)
+                for p in root.rglob('*') if p.is_file()}
+    return {path: (data, contents.get(path + '.gz'), guess_content_type(path),
+                   '"%s"' % hashlib.blake2b(data, digest_size=16).hexdigest())
+            for path, data in contents.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def static_files():
+    """
+    static 目录的文件表，第一次调用时建立。文件服务器启动时调用一次，
+    导入本模块的其他模式不会映射（Windows上也不会锁住）这些文件。
+    """
+    return _load_static_files(STATIC_DIR)
+
+
+# 文件列表缓存：entry 为 ((目录mtime, generation), 文件列表, 完整列表的JSON)
+_FILE_LIST_CACHE = {'generation': 0, 'entry': None}
+
+
+# 每个 /api/events 连接一个队列；队列长度为1，连续的多次修改合并成一次通知
+_EVENT_SUBSCRIBERS = set()
+_EVENT_LOCK = threading.Lock()
+
+
+def invalidate_file_list():
+    """共享目录被修改后调用，使文件列表缓存失效并通知打开的页面刷新"""
+    _FILE_LIST_CACHE['generation'] += 1
+    _FILE_LIST_CACHE['entry'] = None
+    with _EVENT_LOCK:
+        subscribers = list(_EVENT_SUBSCRIBERS)
+    for q in subscribers:
+        try:
+            q.put_nowait('refresh')
+        except queue.Full:
+            pass
+
+
+def watch_shared_dir(path):
+    """用 watchdog 监视共享目录，其他程序的修改也能通知到页面；未安装时返回 None"""
+    if Observer is None:
+        return None
     
-    def __init__(self, *args, **kwargs):
-        self.base_dir = Path(desktop_path) / "FilePasser"
-        self.base_dir.mkdir(exist_ok=True)
-        self.uploads_dir = self.base_dir / "uploads"
-        self.uploads_dir.mkdir(exist_ok=True)
-        
-        self.shared_dir = self.base_dir / "shared"
-        self.shared_dir.mkdir(exist_ok=True)
-        
-        self.downloads_dir = self.base_dir / "downloads"
-        self.downloads_dir.mkdir(exist_ok=True)
-        
-        super().__init__(*args, **kwargs)
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            invalidate_file_list()
     
-    def _send_response(self, status_code=200, content_type='application/json', data=None):
-        """发送HTTP响应"""
-        self.send_response(status_code)
-        self.send_header('Content-Type', content_type)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS, DELETE')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        
-        if data is not None:
-            if content_type == 'application/json':
-                self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
-            else:
-                if isinstance(data, str):
-                    self.wfile.write(data.encode('utf-8'))
-                else:
-                    self.wfile.write(data)
+    observer = Observer()
+    observer.schedule(_Handler(), str(path), recursive=False)
+    observer.daemon = True
+    observer.start()
+    return observer
+
+
+# 分块上传：客户端生成的上传ID -> {'name', 'total', 'ranges': {偏移: 长度}, 'complete', 'ts'}
+# 完成的上传保留到超时，完成后才到达的重传块直接确认，不再写入
+_CHUNKED_UPLOADS = {}
+_CHUNKED_LOCK = threading.Lock()
+
+
+def _covered_prefix(ranges):
+    """已收到的块从0开始连续覆盖到的位置（重叠的块只算一次）"""
+    end = 0
+    for offset, length in sorted(ranges.items()):
+        if offset > end:
+            break  # 出现空洞
+        end = max(end, offset + length)
+    return end
+
+
+# 每10个二进制位对应一级单位
+_BYTE_SCALES = [(1 << (10 * i), unit) for i, unit in enumerate(['B', 'KB', 'MB', 'GB', 'TB', 'PB'])]
+
+
+def preallocate(fd, size):
+    """
+    为即将写入的文件一次性分配磁盘空间，减少边写边扩展带来的元数据更新和碎片。
+    不支持时静默跳过。
+    """
+    if size < PREALLOCATE_MIN:
+        return
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, size)
+        elif os.name == 'nt':
+            # NTFS 设置文件末尾时会直接分配簇
+            os.ftruncate(fd, size)
+    except OSError:
+        pass
+
+
+def _write_all(fd, data):
+    """把 data 完整写入文件描述符（os.write 可能只写入一部分）"""
+    with memoryview(data) as mv:
+        while mv:
+            n = os.write(fd, mv)
+            mv = mv[n:]
+
+
+def is_safe_name(name):
+    """name 是否是共享目录下的单个条目名（不含路径分隔符，也不是 . 或 ..）"""
+    return bool(name) and not any(c in name for c in '/\\\0') and name not in ('.', '..')
+
+
+def _pwrite_all(fd, data, offset):
+    """把 data 完整写入文件的 offset 处；没有 os.pwrite 的平台（Windows）退回 lseek + write"""
+    with memoryview(data) as mv:
+        if hasattr(os, 'pwrite'):
+            while mv:
+                n = os.pwrite(fd, mv, offset)
+                mv = mv[n:]
+                offset += n
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            _write_all(fd, mv)
+
+
+def content_disposition(filename):
+    """生成下载用的Content-Disposition，非ASCII文件名按RFC 5987编码"""
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('"', '_')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{urllib.parse.quote(filename)}"
+
+
+# 文件夹打包下载：文件按块分给多个线程并行压缩（与 pigz 相同的思路），
+# zlib 压缩时会释放GIL，线程即可利用多个CPU核心
+ZIP_BLOCK_SIZE = 1 << 20  # 每个压缩块的原始数据大小
+ZIP_LEVEL = 6
+_zip_workers = max(1, (os.cpu_count() or 2) - 1)
+_zip_pool = ThreadPoolExecutor(max_workers=_zip_workers, thread_name_prefix='zip')
+# 同时在途的压缩块数量，限制打包大文件夹时的内存占用
+ZIP_MAX_PENDING = _zip_workers * 2
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def _deflate_block(data, last):
+    """
+    独立压缩一个数据块。非最后一块以 Z_SYNC_FLUSH 结尾（字节对齐且不是最终块），
+    因此各块的输出直接拼接就是一个合法的 deflate 流。
+    """
+    c = zlib.compressobj(ZIP_LEVEL, zlib.DEFLATED, -15)
+    return c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _dos_datetime(mtime):
+    """把时间戳转换为ZIP使用的 (DOS时间, DOS日期)"""
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+def _open_zip_member(path):
+    """
+    打开要打包的普通文件，与单文件下载一样不跟随符号链接。
+    符号链接、管道等特殊文件以及打不开的文件返回 None，由调用方跳过。
+    """
+    try:
+        if not stat.S_ISREG(os.lstat(path).st_mode):
+            return None
+        # O_NONBLOCK：lstat 之后被换成管道时 open 也不会卡住
+        fd = os.open(path, _DOWNLOAD_OPEN_FLAGS | getattr(os, 'O_NONBLOCK', 0))
+    except OSError:
+        return None
+    try:
+        if stat.S_ISREG(os.fstat(fd).st_mode):
+            return os.fdopen(fd, 'rb')
+    except OSError:
+        pass
+    os.close(fd)
+    return None
+
+
+def write_folder_zip(out, root):
+    """
+    把文件夹打包成ZIP并边压缩边写入 out。
     
-    def do_OPTIONS(self):
-        """处理CORS预检请求"""
-        self._send_response(200, 'application/json', {'status': 'ok'})
+    压缩数据之后跟数据描述符，不需要预先知道压缩后的大小，也不需要 seek；
+    超过4GB的文件或压缩包自动使用ZIP64格式。符号链接、特殊文件和打不开的条目会被跳过。
     
-    def do_GET(self):
-        """处理GET请求"""
-        try:
-            parsed_path = urllib.parse.urlparse(self.path)
-            path = parsed_path.path
-            
-            # 默认路径返回Web界面
-            if path == '/' or path == '/index.html':
-                self._serve_web_interface()
-            
-            # 文件列表接口
-            elif path == '/api/files':
-                self._get_file_list()
-            
-            # 下载文件接口
-            elif path.startswith('/api/download/'):
-                self._download_file(parsed_path)
-            
-            # 获取服务器信息
-            elif path == '/api/info':
-                self._get_server_info()
-            
-            # 删除文件
-            elif path.startswith('/api/delete/'):
-                self._delete_file(parsed_path)
+    Args:
+        out: 可写的二进制流（如响应的 wfile）
+        root: 要打包的文件夹路径
+    """
+    root = os.fspath(root)
+    base = os.path.basename(os.path.normpath(root))
+    entries = []  # 中央目录信息
+    pending = deque()  # 按输出顺序排队的 (类型, 条目, 压缩任务)
+    offset = 0
+    
+    def emit(data):
+        nonlocal offset
+        out.write(data)
+        offset += len(data)
+    
+    def drain(limit):
+        """按顺序写出队列中的内容，直到在途的压缩块不超过 limit 个"""
+        while pending and (len(pending) > limit or pending[0][0] != 'block'):
+            kind, entry, future = pending.popleft()
+            if kind == 'header':
+                entry['offset'] = offset
+                emit(_zip_local_header(entry))
+            elif kind == 'block':
+                data = future.result()
+                entry['csize'] += len(data)
+                emit(data)
+            else:  # 'end'
+                fmt = '<IIQQ' if entry['zip64'] else '<IIII'
+                emit(struct.pack(fmt, 0x08074b50, entry['crc'], entry['csize'], entry['usize']))
+    
+    try:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            rel = os.path.relpath(dirpath, root)
+            prefix = base if rel == '.' else base + '/' + rel.replace(os.sep, '/')
             
-            # 清空文件夹
-            elif path == '/api/clear':
-                self._clear_directory(parsed_path)
+            if not filenames and not dirnames:
+                # 空文件夹单独记录一个目录条目
+                try:
+                    st = os.lstat(dirpath)
+                except OSError:
+                    continue
+                entry = _zip_entry(prefix + '/', st, is_dir=True)
+                entries.append(entry)
+                pending.append(('header', entry, None))
+                pending.append(('end', entry, None))
             
-            # 静态文件服务
-            else:
-                self._serve_static_file(path)
-                
-        except Exception as e:
-            self._send_response(500, 'application/json', {
-                'status': 'error',
-                'message': str(e)
-            })
+            for name in sorted(filenames):
+                f = _open_zip_member(os.path.join(dirpath, name))
+                if f is None:
+                    continue
+                with f:
+                    entry = _zip_entry(prefix + '/' + name, os.fstat(f.fileno()))
+                    entries.append(entry)
+                    pending.append(('header', entry, None))
+                    
+                    data = f.read(ZIP_BLOCK_SIZE)
+                    while True:
+                        nxt = f.read(ZIP_BLOCK_SIZE) if len(data) == ZIP_BLOCK_SIZE else b''
+                        entry['crc'] = zlib.crc32(data, entry['crc'])
+                        entry['usize'] += len(data)
+                        pending.append(('block', entry, _zip_pool.submit(_deflate_block, data, not nxt)))
+                        drain(ZIP_MAX_PENDING)
+                        if not nxt:
+                            break
+                        data = nxt
+                
+                pending.append(('end', entry, None))
+        drain(0)
+    except BaseException:
+        for kind, entry, future in pending:
+            if future is not None:
+                future.cancel()
+        raise
     
-    def do_POST(self):
-        """处理POST请求（文件上传）"""
-        try:
-            if self.path == '/api/upload':
-                self._handle_file_upload()
-            elif self.path == '/api/mkdir':
-                self._handle_mkdir()
-            else:
-                self._send_response(404, 'application/json', {
-                    'status': 'error',
-                    'message': '接口不存在'
-                })
-        except Exception as e:
-            self._send_response(500, 'application/json', {
-                'status': 'error',
-                'message': str(e)
-            })
+    # 中央目录
+    cd_offset = offset
+    for entry in entries:
+        emit(_zip_central_header(entry))
+    cd_size = offset - cd_offset
     
-    def do_DELETE(self):
-        """处理DELETE请求"""
-        try:
-            parsed_path = urllib.parse.urlparse(self.path)
-            if parsed_path.path.startswith('/api/delete/'):
-                self._delete_file(parsed_path)
-            else:
-                self._send_response(404, 'application/json', {
-                    'status': 'error',
-                    'message': '接口不存在'
-                })
-        except Exception as e:
-            self._send_response(500, 'application/json', {
-                'status': 'error',
-                'message': str(e)
-            })
+    count = len(entries)
+    if count >= 0xFFFF or cd_offset >= _ZIP64_LIMIT or cd_size >= _ZIP64_LIMIT:
+        eocd64_offset = offset
+        emit(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset))
+        emit(struct.pack('<IIQI', 0x07064b50, 0, eocd64_offset, 1))
+        emit(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, 0xFFFF, 0xFFFF,
+                         _ZIP64_LIMIT, _ZIP64_LIMIT, 0))
+    else:
+        emit(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+
+def _zip_entry(arcname, st, is_dir=False):
+    """创建一个ZIP条目的信息"""
+    dos_time, dos_date = _dos_datetime(st.st_mtime)
+    return {
+        'name': arcname.encode('utf-8'),
+        'is_dir': is_dir,
+        'time': dos_time,
+        'date': dos_date,
+        'crc': 0,
+        'csize': 0,
+        'usize': 0,
+        'offset': 0,
+        # 原始大小接近4GB的文件压缩后也可能超过4GB，提前按ZIP64写
+        'zip64': not is_dir and st.st_size >= _ZIP64_LIMIT - (1 << 24),
+    }
+
+
+def _zip_local_header(entry):
+    """生成本地文件头（大小和CRC写在随后的数据描述符里）"""
+    flags = 0x0808  # bit 3: 使用数据描述符; bit 11: 文件名为UTF-8
+    method = 0 if entry['is_dir'] else 8
+    if entry['zip64']:
+        extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0)
+        size_field = _ZIP64_LIMIT
+        version = 45
+    else:
+        extra = b''
+        size_field = 0
+        version = 20
+    return struct.pack('<IHHHHHIIIHH', 0x04034b50, version, flags, method,
+                       entry['time'], entry['date'], 0, size_field, size_field,
+                       len(entry['name']), len(extra)) + entry['name'] + extra
+
+
+def _zip_central_header(entry):
+    """生成中央目录中的文件头"""
+    usize, csize, offset = entry['usize'], entry['csize'], entry['offset']
+    extra_fields = []
+    if usize >= _ZIP64_LIMIT or entry['zip64']:
+        extra_fields.append(usize)
+        usize = _ZIP64_LIMIT
+    if csize >= _ZIP64_LIMIT or entry['zip64']:
+        extra_fields.append(csize)
+        csize = _ZIP64_LIMIT
+    if offset >= _ZIP64_LIMIT:
+        extra_fields.append(offset)
+        offset = _ZIP64_LIMIT
+    extra = b''
+    if extra_fields:
+        extra = struct.pack('<HH', 0x0001, 8 * len(extra_fields)) + struct.pack(f'<{len(extra_fields)}Q', *extra_fields)
+    version = 45 if extra_fields else 20
     
-    def _serve_web_interface(self):
-        """提供Web界面"""
-        html_content = """
+    if entry['is_dir']:
+        method, external = 0, (0o40755 << 16) | 0x10
+    else:
+        method, external = 8, 0o100644 << 16
+    return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, 0x0808,
+                       method, entry['time'], entry['date'], entry['crc'], csize, usize,
+                       len(entry['name']), len(extra), 0, 0, 0, external, offset) + entry['name'] + extra
+
+
+def ensure_storage_dirs():
+    """创建文件存储目录（已存在时跳过）"""
+    for d in (BASE_DIR, UPLOADS_DIR, SHARED_DIR, DOWNLOADS_DIR):
+        d.mkdir(parents=True, exist_ok=True)
+    # 上次运行中断时留下的分块上传临时文件已经无法续传
+    for path in UPLOADS_DIR.glob('*.chunks'):
+        path.unlink(missing_ok=True)
+    # 清空共享目录时移进回收目录的内容，上次运行退出前可能还没删完
+    for path in UPLOADS_DIR.glob('.gc-*'):
+        shutil.rmtree(path, ignore_errors=True)
+
+_LINE_COMMENT_RE = re.compile(r'^//.*$|\s+// .*$|^<!--.*-->$')
+
+
+def _minify_html(html):
+    """
+    简单压缩内嵌页面：去掉每行的缩进、空行、单独一行的HTML注释和JS行注释。
+    保留换行，不改变脚本的语句划分。
+    """
+    lines = (_LINE_COMMENT_RE.sub('', line.strip()) for line in html.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+# Web界面，模块加载时压缩、编码一次并计算ETag，之后每次请求直接发送
+_INDEX_HTML = _use_local_assets(_minify_html("""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -272,6 +646,7 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 }
                 
                 #qrcode {
+                    display: block;
                     width: 200px;
                     height: 200px;
                     margin: 0 auto 15px;
@@ -605,7 +980,7 @@ class FileTransferServer(BaseHTTPRequestHandler):
                     
                     <div class="qrcode-section">
                         <h3><i class="fas fa-mobile-alt"></i> 手机扫码访问</h3>
-                        <div id="qrcode"></div>
+                        <img id="qrcode" alt="访问二维码">
                         <p>或访问网址：</p>
                         <div class="url-display" id="serverUrl">正在获取...</div>
                     </div>
@@ -654,6 +1029,26 @@ class FileTransferServer(BaseHTTPRequestHandler):
                                 <p>暂无文件</p>
                             </div>
                         </div>
+                        
+                        <template id="fileItemTemplate">
+                            <div class="file-item">
+                                <div class="file-icon">
+                                    <i></i>
+                                </div>
+                                <div class="file-info">
+                                    <div class="file-name"></div>
+                                    <div class="file-size"></div>
+                                </div>
+                                <div class="file-actions">
+                                    <button class="action-btn download-btn" data-act="download">
+                                        <i class="fas fa-download"></i> <span></span>
+                                    </button>
+                                    <button class="action-btn delete-btn" data-act="delete">
+                                        <i class="fas fa-trash"></i> 删除
+                                    </button>
+                                </div>
+                            </div>
+                        </template>
                     </div>
                 </div>
                 
@@ -694,7 +1089,6 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 </div>
             </div>
             
-            <script src="https://cdn.jsdelivr.net/npm/qrcode@1.5.3/build/qrcode.min.js"></script>
             <script>
                 let currentFile = null;
                 let files = [];
@@ -756,25 +1150,23 @@ class FileTransferServer(BaseHTTPRequestHandler):
                             serverUrl = data.server_url;
                             document.getElementById('serverUrl').textContent = serverUrl;
                             
-                            // 生成二维码
-                            QRCode.toCanvas(document.getElementById('qrcode'), serverUrl, {
-                                width: 200,
-                                height: 200,
-                                color: {
-                                    dark: '#667eea',
-                                    light: '#ffffff'
-                                }
-                            });
+                            // 二维码由服务器生成SVG
+                            document.getElementById('qrcode').src = '/api/qr.svg?url=' + encodeURIComponent(serverUrl);
                         }
                     } catch (error) {
                         1
                     }
                 }
                 
-                // 加载文件列表
+                // 加载文件列表，目录没有变化时服务器返回304，直接沿用当前列表
+                let filesEtag = null;
+                
                 async function loadFiles() {
                     try {
-                        const response = await fetch('/api/files');
+                        const headers = filesEtag ? { 'If-None-Match': filesEtag } : {};
+                        const response = await fetch('/api/files', { headers });
+                        if (response.status === 304) return;
+                        filesEtag = response.headers.get('ETag');
                         const data = await response.json();
                         
                         if (data.status === 'success') {
@@ -787,7 +1179,17 @@ class FileTransferServer(BaseHTTPRequestHandler):
                     }
                 }
                 
-                // 显示文件列表
+                // 日期格式化器只创建一次，渲染每行时复用
+                const DATE_FORMAT = new Intl.DateTimeFormat(undefined, { dateStyle: 'short', timeStyle: 'medium' });
+                
+                // 列表里所有按钮的点击统一在这里处理，文件名从行的 data-name 读取
+                const FILE_ACTIONS = { download: downloadFile, delete: deleteFile };
+                document.getElementById('fileList').addEventListener('click', (e) => {
+                    const btn = e.target.closest('[data-act]');
+                    if (!btn) return;
+                    FILE_ACTIONS[btn.dataset.act](btn.closest('.file-item').dataset.name);
+                });
+                
                 function displayFiles(files) {
                     const fileList = document.getElementById('fileList');
                     
@@ -801,36 +1203,27 @@ class FileTransferServer(BaseHTTPRequestHandler):
                         return;
                     }
                     
-                    let html = '';
+                    // 每行从模板克隆，文本用 textContent 写入，整个列表只插入一次文档
+                    const template = document.getElementById('fileItemTemplate').content;
+                    const frag = document.createDocumentFragment();
                     files.forEach(file => {
                         const icon = getFileIcon(file.name, file.type);
                         const size = formatFileSize(file.size);
-                        const date = new Date(file.modified).toLocaleString();
+                        const date = DATE_FORMAT.format(new Date(file.modified * 1000));  // 服务器返回的是秒
                         
-                        html += `
-                            <div class="file-item">
-                                <div class="file-icon ${icon.type}">
-                                    <i class="${icon.class}"></i>
-                                </div>
-                                <div class="file-info">
-                                    <div class="file-name" title="${file.name}">${file.name}</div>
-                                    <div class="file-size">${size} • ${date}</div>
-                                </div>
-                                <div class="file-actions">
-                                    ${file.type === 'dir' ? '' : `
-                                        <button class="action-btn download-btn" onclick="downloadFile('${file.name}')">
-                                            <i class="fas fa-download"></i> 下载
-                                        </button>
-                                    `}
-                                    <button class="action-btn delete-btn" onclick="deleteFile('${file.name}')">
-                                        <i class="fas fa-trash"></i> 删除
-                                    </button>
-                                </div>
-                            </div>
-                        `;
+                        const row = template.cloneNode(true);
+                        row.firstElementChild.dataset.name = file.name;
+                        row.querySelector('.file-icon').classList.add(icon.type);
+                        row.querySelector('.file-icon i').className = icon.class;
+                        const name = row.querySelector('.file-name');
+                        name.textContent = file.name;
+                        name.title = file.name;
+                        row.querySelector('.file-size').textContent = `${size} • ${date}`;
+                        row.querySelector('.download-btn span').textContent = file.type === 'dir' ? '打包下载' : '下载';
+                        frag.appendChild(row);
                     });
                     
-                    fileList.innerHTML = html;
+                    fileList.replaceChildren(frag);
                 }
                 
                 // 获取文件图标
@@ -852,13 +1245,16 @@ class FileTransferServer(BaseHTTPRequestHandler):
                     }
                 }
                 
-                // 格式化文件大小
+                // 格式化文件大小：单位由二进制位数决定，不需要计算对数
+                const SIZE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB', 'PB'];
+                const SIZE_SCALES = SIZE_UNITS.map((_, i) => 2 ** (i * 10));
+                
                 function formatFileSize(bytes) {
-                    if (bytes === 0) return '0 B';
-                    const k = 1024;
-                    const sizes = ['B', 'KB', 'MB', 'GB'];
-                    const i = Math.floor(Math.log(bytes) / Math.log(k));
-                    return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
+                    if (!bytes) return '0 B';
+                    // Math.clz32 只看低32位，4GB 以上的大小改用高32位计算位数
+                    const bits = bytes < 4294967296 ? 32 - Math.clz32(bytes) : 64 - Math.clz32(bytes / 4294967296);
+                    const i = Math.min((bits - 1) / 10 | 0, SIZE_UNITS.length - 1);
+                    return parseFloat((bytes / SIZE_SCALES[i]).toFixed(2)) + ' ' + SIZE_UNITS[i];
                 }
                 
                 // 选择文件
@@ -867,15 +1263,42 @@ class FileTransferServer(BaseHTTPRequestHandler):
                     uploadFiles(fileInput.files);
                 }
                 
-                // 上传文件
+                // 上传文件：每个文件切成固定大小的块，多个块同时上传，失败时只重传出错的块
+                const UPLOAD_CHUNK = 4 * 1024 * 1024;
+                const UPLOAD_CONCURRENCY = 4;
+                const UPLOAD_RETRIES = 3;
+                
+                function newUploadId() {
+                    // crypto.randomUUID 只在 HTTPS 或 localhost 下可用，局域网地址退回 Math.random
+                    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+                    return Math.random().toString(36).slice(2) + Math.random().toString(36).slice(2) + Date.now().toString(36);
+                }
+                
+                function uploadChunk(file, uploadId, offset, onProgress) {
+                    return new Promise((resolve, reject) => {
+                        const xhr = new XMLHttpRequest();
+                        xhr.upload.addEventListener('progress', (e) => onProgress(e.loaded));
+                        xhr.onload = function() {
+                            let response = null;
+                            try {
+                                response = JSON.parse(xhr.responseText);
+                            } catch (error) {}
+                            if (xhr.status === 200 && response && response.status === 'success') {
+                                resolve(response);
+                            } else {
+                                reject(new Error(response ? response.message : 'HTTP ' + xhr.status));
+                            }
+                        };
+                        xhr.onerror = () => reject(new Error('网络错误'));
+                        const query = `id=${uploadId}&name=${encodeURIComponent(file.name)}&offset=${offset}&total=${file.size}`;
+                        xhr.open('POST', '/api/upload_chunk?' + query);
+                        xhr.send(file.slice(offset, offset + UPLOAD_CHUNK));
+                    });
+                }
+                
                 async function uploadFiles(fileList) {
                     if (fileList.length === 0) return;
                     
-                    const formData = new FormData();
-                    for (let i = 0; i < fileList.length; i++) {
-                        formData.append('files', fileList[i]);
-                    }
-                    
                     const progressBar = document.getElementById('progressBar');
                     const uploadProgress = document.getElementById('uploadProgress');
                     const uploadStats = document.getElementById('uploadStats');
@@ -883,64 +1306,104 @@ class FileTransferServer(BaseHTTPRequestHandler):
                     uploadProgress.style.display = 'block';
                     uploadStats.style.display = 'flex';
                     
-                    try {
-                        const xhr = new XMLHttpRequest();
-                        
-                        xhr.upload.addEventListener('progress', (e) => {
-                            if (e.lengthComputable) {
-                                const percent = (e.loaded / e.total * 100).toFixed(2);
-                                progressBar.style.width = percent + '%';
-                                
-                                const loaded = formatFileSize(e.loaded);
-                                const total = formatFileSize(e.total);
-                                uploadStats.innerHTML = `
-                                    <span>${percent}%</span>
-                                    <span>${loaded} / ${total}</span>
-                                `;
-                            }
-                        });
-                        
-                        xhr.onload = function() {
-                            if (xhr.status === 200) {
-                                const response = JSON.parse(xhr.responseText);
-                                if (response.status === 'success') {
-                                    showMessage('上传成功！', 'success');
-                                    loadFiles();
-                                } else {
-                                    showMessage('上传失败: ' + response.message, 'error');
+                    // 所有文件的所有块放进同一个队列，空文件也要上传一个空块
+                    const tasks = [];
+                    let totalBytes = 0;
+                    for (const file of Array.from(fileList)) {
+                        totalBytes += file.size;
+                        // 每个文件一个上传ID，同名同大小的文件同时上传也不会写进同一个临时文件
+                        const uploadId = newUploadId();
+                        for (let offset = 0; offset < file.size || offset === 0; offset += UPLOAD_CHUNK) {
+                            tasks.push({ file, uploadId, offset, loaded: 0 });
+                        }
+                    }
+                    
+                    let uploaded = 0;
+                    const setLoaded = (task, loaded) => {
+                        uploaded += loaded - task.loaded;
+                        task.loaded = loaded;
+                        const percent = totalBytes ? (uploaded / totalBytes * 100).toFixed(2) : '100.00';
+                        progressBar.style.width = percent + '%';
+                        uploadStats.innerHTML = `
+                            <span>${percent}%</span>
+                            <span>${formatFileSize(uploaded)} / ${formatFileSize(totalBytes)}</span>
+                        `;
+                    };
+                    
+                    let next = 0;
+                    const worker = async () => {
+                        while (next < tasks.length) {
+                            const task = tasks[next++];
+                            for (let attempt = 1; ; attempt++) {
+                                try {
+                                    await uploadChunk(task.file, task.uploadId, task.offset, (loaded) => setLoaded(task, loaded));
+                                    break;
+                                } catch (error) {
+                                    setLoaded(task, 0);
+                                    if (attempt >= UPLOAD_RETRIES) throw error;
                                 }
-                            } else {
-                                showMessage('上传失败: HTTP ' + xhr.status, 'error');
                             }
-                            
-                            uploadProgress.style.display = 'none';
-                            uploadStats.style.display = 'none';
-                            progressBar.style.width = '0%';
-                        };
-                        
-                        xhr.onerror = function() {
-                            showMessage('上传失败: 网络错误', 'error');
-                            uploadProgress.style.display = 'none';
-                            uploadStats.style.display = 'none';
-                            progressBar.style.width = '0%';
-                        };
-                        
-                        xhr.open('POST', '/api/upload');
-                        xhr.send(formData);
-                        
-                        // 重置文件输入
-                        document.getElementById('fileInput').value = '';
-                        
+                            setLoaded(task, Math.min(UPLOAD_CHUNK, task.file.size - task.offset));
+                        }
+                    };
+                    
+                    try {
+                        const workers = [];
+                        for (let i = 0; i < Math.min(UPLOAD_CONCURRENCY, tasks.length); i++) {
+                            workers.push(worker());
+                        }
+                        await Promise.all(workers);
+                        showMessage('上传成功！', 'success');
+                        loadFiles();
                     } catch (error) {
+                        next = tasks.length;  // 停止发出剩余的块
                         showMessage('上传失败: ' + error.message, 'error');
-                        uploadProgress.style.display = 'none';
-                        uploadStats.style.display = 'none';
                     }
-                }
-                
-                // 下载文件
-                function downloadFile(filename) {
-                    window.open(`/api/download/${encodeURIComponent(filename)}`, '_blank');
+                    
+                    uploadProgress.style.display = 'none';
+                    uploadStats.style.display = 'none';
+                    progressBar.style.width = '0%';
+                    // 重置文件输入
+                    document.getElementById('fileInput').value = '';
+                }
+                
+                // 下载文件：较大的文件分成几段用 Range 请求并行下载，再在浏览器里拼接
+                const PARALLEL_PARTS = 4;
+                const PARALLEL_MIN_SIZE = 16 * 1024 * 1024;
+                const PARALLEL_MAX_SIZE = 1024 * 1024 * 1024;  // 更大的文件交给浏览器直接写盘
+                
+                async function downloadFile(filename) {
+                    const url = `/api/download/${encodeURIComponent(filename)}`;
+                    const file = files.find(f => f.name === filename);
+                    if (!file || file.type === 'dir' || file.size < PARALLEL_MIN_SIZE || file.size > PARALLEL_MAX_SIZE) {
+                        window.open(url, '_blank');
+                        return;
+                    }
+                    
+                    try {
+                        showMessage('正在下载: ' + filename, 'success');
+                        const partSize = Math.ceil(file.size / PARALLEL_PARTS);
+                        const parts = [];
+                        for (let start = 0; start < file.size; start += partSize) {
+                            const end = Math.min(start + partSize, file.size) - 1;
+                            parts.push(fetch(url, { headers: { Range: `bytes=${start}-${end}` } }).then(response => {
+                                if (response.status !== 206) throw new Error('HTTP ' + response.status);
+                                return response.blob();
+                            }));
+                        }
+                        const blob = new Blob(await Promise.all(parts));
+                        
+                        const link = document.createElement('a');
+                        link.href = URL.createObjectURL(blob);
+                        link.download = filename;
+                        document.body.appendChild(link);
+                        link.click();
+                        link.remove();
+                        setTimeout(() => URL.revokeObjectURL(link.href), 60000);
+                    } catch (error) {
+                        // 分段下载失败时退回普通下载
+                        window.open(url, '_blank');
+                    }
                 }
                 
                 // 删除文件
@@ -1005,6 +1468,8 @@ class FileTransferServer(BaseHTTPRequestHandler):
                                 loadFiles();
                             } else {
                                 showMessage('操作失败: ' + data.message, 'error');
+                                // 清空失败时可能已经删掉了一部分文件
+                                if (action === 'clear') loadFiles();
                             }
                         })
                         .catch(error => {
@@ -1017,72 +1482,374 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 // 显示消息
                 function showMessage(message, type) {
                     const statusDiv = document.getElementById('uploadStatus');
-                    statusDiv.innerHTML = `
-                        <div class="status ${type}">
-                            ${message}
-                        </div>
-                    `;
+                    // 消息里可能带有文件名，用 textContent 写入，不当作HTML解析
+                    const status = document.createElement('div');
+                    status.className = 'status ' + type;
+                    status.textContent = message;
+                    statusDiv.replaceChildren(status);
                     
                     setTimeout(() => {
                         statusDiv.innerHTML = '';
                     }, 3000);
                 }
                 
-                // 定期刷新文件列表
-                setInterval(loadFiles, 30000); // 每30秒刷新一次
+                // 文件变化时刷新列表：由服务器推送通知，定时刷新只是后备。同一浏览器的多个标签页只保持一条事件流：
+                // 拿到锁的标签页负责连接，收到通知后通过 BroadcastChannel 转告其他标签页。
+                // 不支持 EventSource 或服务器拒绝订阅时，改为每30秒刷新一次（有ETag，未变化时只回304）
+                function watchFileChanges() {
+                    if (!window.EventSource) {
+                        setInterval(loadFiles, 30000);
+                        return;
+                    }
+                    const channel = window.BroadcastChannel ? new BroadcastChannel('flowlink-files') : null;
+                    if (channel) channel.onmessage = () => loadFiles();
+                    
+                    const connect = () => new Promise(resolve => {
+                        const events = new EventSource('/api/events');
+                        events.onmessage = () => {
+                            loadFiles();
+                            if (channel) channel.postMessage('refresh');
+                        };
+                        events.onerror = () => {
+                            // 网络中断时浏览器会自动重连；服务器返回错误时连接被关闭，不再重试
+                            if (events.readyState === EventSource.CLOSED) {
+                                setInterval(loadFiles, 30000);
+                                resolve();
+                            }
+                        };
+                    });
+                    
+                    if (channel && navigator.locks) {
+                        navigator.locks.request('flowlink-events', connect);
+                    } else {
+                        connect();
+                    }
+                }
+                watchFileChanges();
             </script>
         </body>
         </html>
+        """)).encode('utf-8')
+_INDEX_ETAG = '"%s"' % hashlib.blake2b(_INDEX_HTML, digest_size=8).hexdigest()
+# 预先压缩好的页面，按浏览器支持的编码选择发送
+_INDEX_GZ = gzip.compress(_INDEX_HTML, compresslevel=9)
+_INDEX_BR = brotli.compress(_INDEX_HTML, quality=11) if brotli is not None else None
+
+
+def _index_response(encoding, body):
+    """预先拼好某种编码版本页面的响应头（bytes）"""
+    lines = ['Content-Type: text/html; charset=utf-8']
+    if encoding:
+        lines.append(f'Content-Encoding: {encoding}')
+    lines += [f'Content-Length: {len(body)}', 'Vary: Accept-Encoding',
+              f'ETag: {_INDEX_ETAG}', 'Cache-Control: public, max-age=300']
+    return ''.join(line + '\r\n' for line in lines).encode('latin-1'), body
+
+
+# 编码 -> (响应头, 响应体)，请求时只需选出一项直接发送
+_INDEX_RESPONSES = {None: _index_response(None, _INDEX_HTML), 'gzip': _index_response('gzip', _INDEX_GZ)}
+if _INDEX_BR is not None:
+    _INDEX_RESPONSES['br'] = _index_response('br', _INDEX_BR)
+
+class FileTransferServer(BaseHTTPRequestHandler):
+    """HTTP请求处理器，提供文件传输接口"""
+    
+    # HTTP/1.1 默认保持连接，页面轮询时不必每次重新握手
+    protocol_version = 'HTTP/1.1'
+    # 空闲的保持连接在超时后关闭，释放处理线程
+    timeout = KEEPALIVE_TIMEOUT
+    # 请求行和头部按行读取，较大的读缓冲减少 recv 调用；
+    # 上传时大于缓冲区的 readinto 会直接读进目标缓冲区，不经过这里
+    rbufsize = 1 << 16
+    
+    base_dir = BASE_DIR
+    uploads_dir = UPLOADS_DIR
+    shared_dir = SHARED_DIR
+    downloads_dir = DOWNLOADS_DIR
+    
+    def setup(self):
+        super().setup()
+        # 并非所有平台都会把监听套接字的 TCP_NODELAY 继承给新连接
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+        self._slot = None
+    
+    def handle_one_request(self):
+        """
+        等到下一个请求的数据到达后才占用处理名额，处理完立即归还，
+        保持连接空闲期间不占名额。名额长时间不可用时返回503并断开连接。
         """
+        slots = getattr(self.server, '_slots', None)
+        if slots is None:
+            super().handle_one_request()
+            return
+        try:
+            if not self.rfile.peek(1):
+                self.close_connection = True  # 客户端已关闭连接
+                return
+        except OSError:  # 包括空闲超时
+            self.close_connection = True
+            return
+        
+        if not slots.acquire(timeout=SLOT_WAIT_TIMEOUT):
+            self.close_connection = True
+            try:
+                self.wfile.write(b'HTTP/1.1 503 Service Unavailable\r\n'
+                                 b'Content-Length: 0\r\nRetry-After: 1\r\n'
+                                 b'Connection: close\r\n\r\n')
+            except OSError:
+                pass
+            return
+        self._slot = slots
+        try:
+            super().handle_one_request()
+        finally:
+            self._release_slot()
+    
+    def _release_slot(self):
+        """提前归还处理名额（用于长时间保持的连接，如事件流）"""
+        if self._slot is not None:
+            self._slot.release()
+            self._slot = None
+    
+    def _send_response(self, status_code=200, content_type='application/json', data=None, headers=None):
+        """发送HTTP响应（headers 为额外的响应头）"""
+        if data is None:
+            body = b''
+        elif isinstance(data, (bytes, mmap.mmap)):
+            body = data
+        elif content_type == 'application/json':
+            body = _dumps(data)
+        elif isinstance(data, str):
+            body = data.encode('utf-8')
+        else:
+            body = data
+        
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        # 固定的CORS头预先编码好，直接追加到待发送的响应头缓冲区
+        self._headers_buffer.append(_CORS_HEADERS)
+        if headers:
+            for name, value in headers.items():
+                self.send_header(name, value)
+        if status_code >= 400 or self.close_connection:
+            # 出错时请求体可能没有读完，关闭连接避免残留数据被当成下一个请求；
+            # 客户端要求关闭（或 HTTP/1.0 没有要求保持）时也照实告诉它
+            self.send_header('Connection', 'close')
+        elif self.request_version == 'HTTP/1.0':
+            # HTTP/1.0 客户端明确要求了 keep-alive 才会走到这里；HTTP/1.1 默认保持连接，不用发
+            self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+        
+        if body:
+            self.wfile.write(body)
+    
+    def do_OPTIONS(self):
+        """处理CORS预检请求"""
+        self._send_response(200, 'application/json', {'status': 'ok'})
+    
+    # 路由表：完整路径 -> 处理函数(self, parsed_path)；
+    # 前缀路由按顺序匹配，前缀之后的部分（未解码）传给处理函数
+    _GET_ROUTES = {
+        # 默认路径返回Web界面
+        '/': lambda self, parsed_path: self._serve_web_interface(),
+        '/index.html': lambda self, parsed_path: self._serve_web_interface(),
+        # 文件列表接口
+        '/api/files': lambda self, parsed_path: self._get_file_list(parsed_path),
+        # 获取服务器信息
+        '/api/info': lambda self, parsed_path: self._get_server_info(),
+        # 文件变化通知（Server-Sent Events）
+        '/api/events': lambda self, parsed_path: self._serve_events(),
+        # 访问二维码（SVG）
+        '/api/qr.svg': lambda self, parsed_path: self._serve_qr_svg(parsed_path),
+        # 清空文件夹
+        '/api/clear': lambda self, parsed_path: self._clear_directory(parsed_path),
+    }
+    _GET_PREFIX_ROUTES = (
+        # 下载文件接口
+        ('/api/download/', lambda self, rest: self._download_file(rest)),
+        # 删除文件
+        ('/api/delete/', lambda self, rest: self._delete_file(rest)),
+        # 本地化的前端依赖，路径带版本号可长期缓存
+        ('/assets/', lambda self, rest: self._serve_static_file('/' + rest, immutable=True)),
+    )
+    _POST_ROUTES = {
+        '/api/upload': lambda self, parsed_path: self._handle_file_upload(parsed_path),
+        '/api/upload_chunk': lambda self, parsed_path: self._handle_upload_chunk(parsed_path),
+        '/api/mkdir': lambda self, parsed_path: self._handle_mkdir(),
+    }
+    _DELETE_PREFIX_ROUTES = (
+        ('/api/delete/', lambda self, rest: self._delete_file(rest)),
+    )
+    
+    def _route(self, routes, prefix_routes=(), fallback=None):
+        """按路由表分发请求，都不匹配时交给 fallback(path)，没有 fallback 则返回404"""
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            path = parsed_path.path
+            
+            handler = routes.get(path)
+            if handler is not None:
+                handler(self, parsed_path)
+                return
+            for prefix, handler in prefix_routes:
+                if path.startswith(prefix):
+                    handler(self, path[len(prefix):])
+                    return
+            
+            if fallback is not None:
+                fallback(path)
+            else:
+                self._send_response(404, 'application/json', {
+                    'status': 'error',
+                    'message': '接口不存在'
+                })
+                
+        except Exception as e:
+            self._send_response(500, 'application/json', {
+                'status': 'error',
+                'message': str(e)
+            })
+    
+    def do_GET(self):
+        """处理GET请求，未匹配的路径按静态文件处理"""
+        self._route(self._GET_ROUTES, self._GET_PREFIX_ROUTES, self._serve_static_file)
+    
+    def do_POST(self):
+        """处理POST请求（文件上传、新建文件夹）"""
+        self._route(self._POST_ROUTES)
+    
+    def do_DELETE(self):
+        """处理DELETE请求"""
+        self._route({}, self._DELETE_PREFIX_ROUTES)
+    
+    def _serve_web_interface(self):
+        """提供Web界面"""
+        # 页面内容不变时返回304，浏览器直接使用缓存
+        if self.headers.get('If-None-Match') == _INDEX_ETAG:
+            self.send_response(304)
+            self.send_header('ETag', _INDEX_ETAG)
+            self.end_headers()
+            return
+        
+        accepted = {item.split(';')[0].strip() for item in self.headers.get('Accept-Encoding', '').split(',')}
+        if 'br' in accepted and 'br' in _INDEX_RESPONSES:
+            headers, body = _INDEX_RESPONSES['br']
+        elif 'gzip' in accepted:
+            headers, body = _INDEX_RESPONSES['gzip']
+        else:
+            headers, body = _INDEX_RESPONSES[None]
         
-        self._send_response(200, 'text/html; charset=utf-8', html_content)
+        self.send_response(200)
+        self._headers_buffer.append(headers)
+        self.end_headers()
+        self.wfile.write(body)
     
-    def _serve_static_file(self, path):
-        """提供静态文件（主要用于CSS、JS等）"""
-        static_dir = Path(__file__).parent / 'static'
-        file_path = static_dir / path.lstrip('/')
+    def _serve_static_file(self, path, immutable=False):
+        """提供静态文件（主要用于CSS、JS等），存在 .gz 预压缩版本时优先发送"""
+        # 只查启动时建好的表，不访问文件系统，也不会被 ../ 带出 static 目录
+        entry = static_files().get(path)
         
-        if file_path.exists() and file_path.is_file():
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            with open(file_path, 'rb') as f:
-                self._send_response(200, mime_type or 'application/octet-stream', f.read())
+        if entry is not None:
+            data, gz_data, content_type, etag = entry
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            
+            headers = {'ETag': etag}
+            if immutable:
+                headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            if gz_data is not None:
+                headers['Vary'] = 'Accept-Encoding'
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    headers['Content-Encoding'] = 'gzip'
+                    data = gz_data
+            
+            self._send_response(200, content_type, data, headers)
         else:
             self._send_response(404, 'application/json', {
                 'status': 'error',
                 'message': '文件不存在'
             })
     
-    def _get_file_list(self):
-        """获取文件列表"""
+    def _get_file_list(self, parsed_path):
+        """获取文件列表（支持 ?offset=&limit= 分页，目录未变化时返回304）"""
         try:
-            files = []
-            shared_path = self.shared_dir
+            query = urllib.parse.parse_qs(parsed_path.query)
+            offset = max(0, int(query.get('offset', ['0'])[0] or 0))
+            limit = query.get('limit', [''])[0]
+            limit = max(0, int(limit)) if limit else None
             
-            for item in shared_path.iterdir():
-                stat = item.stat()
-                files.append({
-                    'name': item.name,
-                    'size': stat.st_size,
-                    'type': 'dir' if item.is_dir() else 'file',
-                    'modified': stat.st_mtime,
-                    'created': stat.st_ctime
-                })
+            # 增删文件都会改变目录的修改时间，本程序自己修改目录时还会递增 generation，
+            # 两者都没变就说明列表没有变化
+            key = (os.stat(self.shared_dir).st_mtime_ns, _FILE_LIST_CACHE['generation'])
+            etag = '"%x-%d-%d-%s"' % (key[0], key[1], offset, limit if limit is not None else '')
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
             
-            # 按修改时间排序，最新的在前面
-            files.sort(key=lambda x: x['modified'], reverse=True)
+            cached = _FILE_LIST_CACHE['entry']
+            if cached is not None and cached[0] == key:
+                _, files, full_payload = cached
+            else:
+                files = self._scan_shared_dir()
+                full_payload = _dumps({
+                    'status': 'success',
+                    'files': files,
+                    'total': len(files),
+                    'offset': 0
+                })
+                _FILE_LIST_CACHE['entry'] = (key, files, full_payload)
             
-            self._send_response(200, 'application/json', {
-                'status': 'success',
-                'files': files
-            })
+            if offset == 0 and limit is None:
+                payload = full_payload
+            else:
+                end = offset + limit if limit is not None else None
+                payload = _dumps({
+                    'status': 'success',
+                    'files': files[offset:end],
+                    'total': len(files),
+                    'offset': offset
+                })
+            self._send_response(200, 'application/json', payload, {'ETag': etag})
         except Exception as e:
             self._send_response(500, 'application/json', {
                 'status': 'error',
                 'message': str(e)
             })
     
-    def _handle_file_upload(self):
-        """处理文件上传"""
+    def _scan_shared_dir(self):
+        """扫描共享目录，返回按修改时间倒序排列的文件信息列表"""
+        files = []
+        
+        # scandir 在枚举目录时就带回了文件类型（Windows上还有完整的stat信息），
+        # 不必再为每个文件单独调用 stat
+        with os.scandir(self.shared_dir) as it:
+            for entry in it:
+                st = entry.stat(follow_symlinks=False)
+                is_dir = entry.is_dir(follow_symlinks=False)
+                files.append({
+                    'name': entry.name,
+                    'size': 0 if is_dir else st.st_size,
+                    'type': 'dir' if is_dir else 'file',
+                    'modified': st.st_mtime,
+                    'created': st.st_ctime
+                })
+        
+        # 按修改时间排序，最新的在前面
+        files.sort(key=lambda x: x['modified'], reverse=True)
+        return files
+    
+    def _handle_file_upload(self, parsed_path):
+        """
+        处理文件上传（带 ?hash=1 时同时返回每个文件的SHA-256；
+        ?sizes=各文件大小（逗号分隔，按文件顺序）时按大小预分配磁盘空间）
+        """
         try:
             content_type = self.headers.get('content-type', '')
             
@@ -1102,29 +1869,28 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 })
                 return
             
-            # 简化处理：实际应该解析multipart数据
-            # 这里使用简单的实现
-            import cgi
-            form = cgi.FieldStorage(
-                fp=self.rfile,
-                headers=self.headers,
-                environ={'REQUEST_METHOD': 'POST'}
-            )
+            boundary = self.headers.get_param('boundary')
+            if not boundary:
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '缺少multipart分隔符'
+                })
+                return
             
-            uploaded_files = []
-            for field in form.list:
-                if field.filename:
-                    # 保存文件
-                    file_path = self.shared_dir / field.filename
-                    with open(file_path, 'wb') as f:
-                        f.write(field.file.read())
-                    uploaded_files.append(field.filename)
+            query = urllib.parse.parse_qs(parsed_path.query)
+            with_hash = query.get('hash') == ['1']
+            size_hints = [int(size) for size in query.get('sizes', [''])[0].split(',') if size.isdigit()]
+            uploaded_files, digests = self._receive_multipart(
+                boundary.encode('latin-1'), content_length, with_hash, size_hints)
             
-            self._send_response(200, 'application/json', {
+            result = {
                 'status': 'success',
                 'message': f'成功上传 {len(uploaded_files)} 个文件',
                 'files': uploaded_files
-            })
+            }
+            if with_hash:
+                result['sha256'] = digests
+            self._send_response(200, 'application/json', result)
             
         except Exception as e:
             self._send_response(500, 'application/json', {
@@ -1132,30 +1898,343 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 'message': str(e)
             })
     
-    def _download_file(self, parsed_path):
-        """处理文件下载"""
+    def _handle_upload_chunk(self, parsed_path):
+        """
+        处理分块上传：请求体是文件从 offset 开始的一段原始数据，id 为客户端生成的上传ID。
+        各块互不重叠，可以由多个连接并行写入；收到的块完整覆盖整个文件后才移到共享目录。
+        """
         try:
-            # 获取文件名
-            filename = urllib.parse.unquote(parsed_path.path.replace('/api/download/', ''))
-            file_path = self.shared_dir / filename
+            query = urllib.parse.parse_qs(parsed_path.query)
+            upload_id = query.get('id', [''])[0]
+            name = query.get('name', [''])[0]
+            offset = int(query.get('offset', ['0'])[0])
+            total = int(query.get('total', ['0'])[0])
+            length = int(self.headers.get('content-length', 0))
             
-            if not file_path.exists():
-                self._send_response(404, 'application/json', {
+            if not _UPLOAD_ID_RE.match(upload_id):
+                self._send_response(400, 'application/json', {
                     'status': 'error',
-                    'message': '文件不存在'
+                    'message': '无效的上传ID'
+                })
+                return
+            if not is_safe_name(name):
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '无效的文件名'
+                })
+                return
+            if offset < 0 or length > UPLOAD_CHUNK_MAX or offset + length > total:
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '无效的分块范围'
                 })
                 return
             
-            # 设置响应头
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/octet-stream')
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.send_header('Content-Length', str(file_path.stat().st_size))
-            self.end_headers()
+            # 每个上传有自己的临时文件，重试的块直接覆盖原来的位置
+            temp_path = self.uploads_dir / f'{upload_id}.chunks'
+            now = time.monotonic()
+            with _CHUNKED_LOCK:
+                expired = [uid for uid, state in _CHUNKED_UPLOADS.items()
+                           if now - state['ts'] > CHUNKED_UPLOAD_TIMEOUT]
+                for uid in expired:
+                    del _CHUNKED_UPLOADS[uid]
+                state = _CHUNKED_UPLOADS.get(upload_id)
+                is_new = state is None
+                if is_new:
+                    state = _CHUNKED_UPLOADS[upload_id] = {
+                        'name': name, 'total': total, 'ranges': {}, 'complete': False, 'ts': now
+                    }
+                mismatch = state['name'] != name or state['total'] != total
+                already_complete = state['complete']
+                state['ts'] = now
+            # 放弃的上传删除临时文件（已完成的上传临时文件已经改名，不存在）
+            for uid in expired:
+                (self.uploads_dir / f'{uid}.chunks').unlink(missing_ok=True)
+            
+            if mismatch:
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '上传ID与文件不匹配'
+                })
+                return
+            if already_complete:
+                # 请求体没有读，不能再复用这个连接
+                self.close_connection = True
+                self._send_response(200, 'application/json', {
+                    'status': 'success',
+                    'received': total,
+                    'complete': True
+                })
+                return
+            
+            # 边接收边写入，每个请求只占用一个 UPLOAD_CHUNK_SIZE 的缓冲区
+            fd = os.open(temp_path, _CHUNK_OPEN_FLAGS, 0o644)
+            try:
+                if is_new:
+                    preallocate(fd, total)
+                buf = memoryview(bytearray(min(length, UPLOAD_CHUNK_SIZE)))
+                received = 0
+                while received < length:
+                    n = self.rfile.readinto(buf[:length - received])
+                    if not n:
+                        raise ValueError('上传数据不完整')
+                    _pwrite_all(fd, buf[:n], offset + received)
+                    received += n
+            finally:
+                os.close(fd)
+            
+            with _CHUNKED_LOCK:
+                late = state['complete']
+                if not late:
+                    state['ranges'][offset] = length
+                    received = _covered_prefix(state['ranges'])
+                    state['complete'] = complete = received == total
+                    if complete:
+                        # 在锁内改名，迟到的块清理临时文件时不会删掉还没改名的文件
+                        os.replace(temp_path, self.shared_dir / name)
+                        state['ranges'] = {}
+            
+            if late:
+                # 其他连接已经完成了这个上传，这里写入时可能重新创建了临时文件
+                temp_path.unlink(missing_ok=True)
+                received, complete = total, True
+            elif complete:
+                invalidate_file_list()
+            
+            self._send_response(200, 'application/json', {
+                'status': 'success',
+                'received': received,
+                'complete': complete
+            })
+            
+        except Exception as e:
+            self._send_response(500, 'application/json', {
+                'status': 'error',
+                'message': f'上传失败: {str(e)}'
+            })
+    
+    def _receive_multipart(self, boundary, content_length, with_hash=False, size_hints=()):
+        """
+        边接收边解析multipart/form-data请求体，文件内容分块写入临时文件，
+        内存占用与上传文件大小无关。每个文件接收完整后才重命名到共享目录。
+        
+        Args:
+            boundary: multipart分隔符（bytes）
+            content_length: 请求体长度
+            with_hash: 是否在写入的同时计算SHA-256
+            size_hints: 客户端给出的各文件大小，按文件部分的顺序，用于预分配磁盘空间
+            
+        Returns:
+            (已保存的文件名列表, {文件名: SHA-256十六进制})
+        """
+        delimiter = b'\r\n--' + boundary
+        keep = len(delimiter) - 1  # 缓冲区末尾可能是被截断的分隔符，需要留到下一轮
+        # 固定大小的接收缓冲区，未处理的数据位于 buf[start:end]，
+        # 套接字数据直接 readinto 到末尾，写盘时直接使用其中的切片，不额外复制
+        buf = bytearray(max(2 * UPLOAD_CHUNK_SIZE, 1 << 16))
+        view = memoryview(buf)
+        # 请求体开头的分隔符前没有换行，补上后所有分隔符都能按 delimiter 查找
+        buf[:2] = b'\r\n'
+        start, end = 0, 2
+        remaining = content_length
+        
+        def fill():
+            """从套接字再读一块数据到缓冲区末尾，空间不足时先把未处理的数据移到开头"""
+            nonlocal start, end, remaining
+            if remaining <= 0:
+                raise ValueError('上传数据不完整')
+            if len(buf) - end < UPLOAD_CHUNK_SIZE and start > 0:
+                buf[:end - start] = buf[start:end]
+                start, end = 0, end - start
+            want = min(remaining, len(buf) - end)
+            if want <= 0:
+                raise ValueError('multipart头部过长')
+            n = self.rfile.readinto(view[end:end + want])
+            if not n:
+                raise ValueError('上传数据不完整')
+            end += n
+            remaining -= n
+        
+        def find(sub):
+            """在未处理的数据中查找 sub，找不到时继续读取"""
+            searched = 0  # 已确认不包含 sub 起点的长度（相对 start）
+            while True:
+                idx = buf.find(sub, start + searched, end)
+                if idx >= 0:
+                    return idx
+                searched = max(0, end - start - len(sub) + 1)
+                fill()
+        
+        saved = []
+        digests = {}
+        file_index = 0  # 当前是第几个文件部分，对应 size_hints 中的下标
+        # 跳过第一个分隔符之前的内容
+        start = find(delimiter) + len(delimiter)
+        
+        while True:
+            while end - start < 2:
+                fill()
+            if buf[start:start + 2] == b'--':
+                break  # 结束分隔符
+            
+            header_end = find(b'\r\n\r\n')
+            part_headers = HeaderParser().parsestr(buf[start:header_end].decode('utf-8', 'replace').lstrip())
+            start = header_end + 4
+            
+            filename = part_headers.get_filename()
+            if filename:
+                # 有的浏览器会带上完整路径，只保留最后的文件名
+                filename = re.split(r'[\\/]', filename)[-1]
+                if not is_safe_name(filename):
+                    filename = None
+            # 先写到 uploads 目录下的临时文件，未传完的文件不会出现在共享列表里
+            temp_path = self.uploads_dir / f'{uuid.uuid4().hex}.part' if filename else None
+            if filename:
+                size_hint = size_hints[file_index] if file_index < len(size_hints) else None
+                file_index += 1
+            fd = os.open(temp_path, _UPLOAD_OPEN_FLAGS, 0o644) if temp_path else None
+            # 哈希随数据写入增量计算，不需要上传完再把文件读一遍
+            h = hashlib.sha256() if fd is not None and with_hash else None
+            written = 0
+            try:
+                if fd is not None and size_hint:
+                    # 只按客户端给出的大小预分配（不超过剩余的请求体），写完再截断到实际大小；
+                    # 没有大小提示时不预分配，多文件上传不会为每个文件都预留整个请求体的空间
+                    preallocate(fd, min(size_hint, end - start + remaining))
+                scanned = 0  # 已确认不包含分隔符起点的长度（相对 start）
+                while True:
+                    idx = buf.find(delimiter, start + scanned, end)
+                    if idx < 0 and remaining > 0 and end - start - keep < UPLOAD_CHUNK_SIZE:
+                        # 套接字每次只返回几十KB，攒够一整块再写，减少 write 调用次数
+                        scanned = max(0, end - start - keep)
+                        fill()
+                        continue
+                    stop = idx if idx >= 0 else max(start, end - keep)
+                    if fd is not None and stop > start:
+                        _write_all(fd, view[start:stop])
+                        if h:
+                            h.update(view[start:stop])
+                        written += stop - start
+                    if idx >= 0:
+                        start = idx + len(delimiter)
+                        break
+                    start = stop
+                    scanned = 0
+                    fill()
+                
+                if fd is not None:
+                    os.ftruncate(fd, written)
+            except Exception:
+                if fd is not None:
+                    os.close(fd)
+                    temp_path.unlink(missing_ok=True)
+                raise
+            
+            if fd is not None:
+                os.close(fd)
+                # 同一磁盘内重命名只修改目录项，不复制数据
+                os.replace(temp_path, self.shared_dir / filename)
+                invalidate_file_list()
+                saved.append(filename)
+                if h:
+                    digests[filename] = h.hexdigest()
+        
+        # 丢弃结束分隔符之后的内容，保证连接可以继续使用
+        while remaining > 0:
+            n = len(self.rfile.read(min(remaining, UPLOAD_CHUNK_SIZE)))
+            if not n:
+                break
+            remaining -= n
+        
+        return saved, digests
+    
+    def _download_file(self, name):
+        """处理文件下载（name 为路径中 /api/download/ 之后未解码的部分）"""
+        try:
+            # 获取文件名
+            filename = urllib.parse.unquote(name)
+            if not is_safe_name(filename):
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '无效的文件名'
+                })
+                return
+            file_path = self.shared_dir / filename
+            
+            # 直接打开文件，不存在时由 open 报错，大小用 fstat 取，不再另外 stat
+            try:
+                fd = os.open(file_path, _DOWNLOAD_OPEN_FLAGS)
+                st = os.fstat(fd)
+            except OSError:
+                # Windows 上不能用 os.open 打开目录，O_NOFOLLOW 遇到符号链接也会失败
+                fd, st = None, None
+            
+            if st is None or not stat.S_ISREG(st.st_mode):
+                if fd is not None:
+                    os.close(fd)
+                try:
+                    is_dir = stat.S_ISDIR(os.lstat(file_path).st_mode)
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    self._send_folder_zip(file_path)
+                else:
+                    self._send_response(404, 'application/json', {
+                        'status': 'error',
+                        'message': '文件不存在'
+                    })
+                return
+            
+            size = st.st_size
+            start, end = 0, size - 1
+            
+            # 支持 Range 请求，客户端可以分段并行下载或断点续传；
+            # 格式不对或包含多个范围时按整个文件返回
+            match = _RANGE_RE.match(self.headers.get('Range', ''))
+            first, last = match.groups() if match else ('', '')
+            if not first and last:
+                # bytes=-N 表示最后 N 个字节
+                start = max(0, size - int(last))
+            elif first and not (last and int(last) < int(first)):
+                start = int(first)
+                if last:
+                    end = min(int(last), size - 1)
+            else:
+                match = None
             
-            # 发送文件内容
-            with open(file_path, 'rb') as f:
-                shutil.copyfileobj(f, self.wfile)
+            if match and start > end:
+                # 起点超出文件末尾（或 bytes=-0），范围无法满足
+                os.close(fd)
+                self._send_response(416, 'application/json', {
+                    'status': 'error',
+                    'message': '请求的范围无效'
+                }, {'Content-Range': f'bytes */{size}'})
+                return
+            
+            with open(fd, 'rb') as f:
+                # 塞住套接字，让响应头和文件开头合并成满载的数据包再发出
+                self._set_cork(True)
+                try:
+                    # 设置响应头
+                    self.send_response(206 if match else 200)
+                    self.send_header('Content-Type', 'application/octet-stream')
+                    self.send_header('Content-Disposition', content_disposition(filename))
+                    self.send_header('Accept-Ranges', 'bytes')
+                    if match:
+                        self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+                    self.send_header('Content-Length', str(end - start + 1))
+                    self.end_headers()
+                    self.wfile.flush()
+                    
+                    # 发送文件内容：由内核直接把文件页拷贝到套接字（sendfile），
+                    # 不支持 sendfile 的平台上 socket.sendfile 会自动退回普通发送
+                    try:
+                        self.connection.sendfile(f, offset=start, count=end - start + 1)
+                    except OSError:
+                        # 客户端中途断开，响应头已经发出，只能关闭连接
+                        self.close_connection = True
+                finally:
+                    self._set_cork(False)
                 
         except Exception as e:
             self._send_response(500, 'application/json', {
@@ -1163,23 +2242,107 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 'message': str(e)
             })
     
-    def _delete_file(self, parsed_path):
-        """删除文件"""
+    def _set_cork(self, enabled):
+        """开关 TCP_CORK（仅Linux），开启期间内核只发送满载的数据包"""
+        if hasattr(socket, 'TCP_CORK'):
+            try:
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if enabled else 0)
+            except OSError:
+                pass
+    
+    def _serve_events(self):
+        """
+        以 Server-Sent Events 推送共享目录的变化，页面收到后再请求文件列表，
+        没有变化时不产生任何轮询请求。事件流一直占用一个线程，但不占处理名额，
+        数量由 MAX_EVENT_SUBSCRIBERS 单独限制。
+        """
+        q = queue.Queue(maxsize=1)
+        with _EVENT_LOCK:
+            accepted = len(_EVENT_SUBSCRIBERS) < MAX_EVENT_SUBSCRIBERS
+            if accepted:
+                _EVENT_SUBSCRIBERS.add(q)
+        if not accepted:
+            self._send_response(503, 'application/json', {
+                'status': 'error',
+                'message': '事件订阅已满'
+            })
+            return
+        # 事件流会一直保持，不能长期占着处理上传下载用的名额
+        self._release_slot()
         try:
-            filename = urllib.parse.unquote(parsed_path.path.replace('/api/delete/', ''))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self._headers_buffer.append(_CORS_HEADERS)
+            # 事件流没有长度，结束即断开连接
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            self.wfile.write(b'retry: 3000\n\n')
+            
+            while True:
+                try:
+                    message = q.get(timeout=EVENTS_PING_INTERVAL)
+                    self.wfile.write(b'data: %s\n\n' % message.encode())
+                except queue.Empty:
+                    self.wfile.write(b': ping\n\n')
+        except OSError:
+            pass  # 页面已关闭
+        finally:
+            with _EVENT_LOCK:
+                _EVENT_SUBSCRIBERS.discard(q)
+    
+    def _serve_qr_svg(self, parsed_path):
+        """返回访问地址的二维码SVG（?url= 指定地址，默认为本机局域网地址）"""
+        query = urllib.parse.parse_qs(parsed_path.query)
+        url = query.get('url', [f'http://{get_local_ip()}:{self.server.server_address[1]}'])[0]
+        self._send_response(200, 'image/svg+xml', _render_qr_svg(url), {
+            'Cache-Control': 'public, max-age=300'
+        })
+    
+    def _send_folder_zip(self, folder_path):
+        """把文件夹打包成ZIP边压缩边发送"""
+        # 压缩后的大小事先未知，发送完毕后关闭连接来标记响应结束
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition', content_disposition(folder_path.name + '.zip'))
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        try:
+            write_folder_zip(self.wfile, folder_path)
+        except Exception as e:
+            # 响应头已经发出，无法再返回错误信息，只能中断连接
+            self.log_error('打包文件夹失败: %s', e)
+    
+    def _delete_file(self, name):
+        """删除文件（name 为路径中 /api/delete/ 之后未解码的部分）"""
+        try:
+            filename = urllib.parse.unquote(name)
+            if not is_safe_name(filename):
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '无效的文件名'
+                })
+                return
             file_path = self.shared_dir / filename
             
-            if not file_path.exists():
+            # lstat 不跟随符号链接：删除链接本身，而不是链接指向的内容
+            try:
+                st = os.lstat(file_path)
+            except FileNotFoundError:
                 self._send_response(404, 'application/json', {
                     'status': 'error',
                     'message': '文件不存在'
                 })
                 return
             
-            if file_path.is_dir():
+            if stat.S_ISDIR(st.st_mode):
                 shutil.rmtree(file_path)
             else:
-                file_path.unlink()
+                os.unlink(file_path)
+            invalidate_file_list()
             
             self._send_response(200, 'application/json', {
                 'status': 'success',
@@ -1195,12 +2358,32 @@ class FileTransferServer(BaseHTTPRequestHandler):
     def _clear_directory(self, parsed_path):
         """清空共享目录"""
         try:
-            # 删除所有文件和文件夹
-            for item in self.shared_dir.iterdir():
-                if item.is_dir():
-                    shutil.rmtree(item)
-                else:
-                    item.unlink()
+            # 先把所有条目移到 uploads 下的回收目录（同一磁盘内只是改目录项），
+            # 真正的删除放到后台线程，响应时间与文件数量和大小无关。
+            # 共享目录本身保留不动，监视它的 watchdog 和资源管理器窗口不受影响
+            trash = self.uploads_dir / f'.gc-{time.time_ns()}'
+            trash.mkdir()
+            failed = []
+            try:
+                with os.scandir(self.shared_dir) as it:
+                    for entry in it:
+                        try:
+                            os.rename(entry.path, trash / entry.name)
+                        except OSError:
+                            # 被占用等原因移不走的条目跳过，其余条目照常清空
+                            failed.append(entry.name)
+            finally:
+                # 已经移走的条目无论如何都要反映到文件列表，回收目录也要删掉
+                invalidate_file_list()
+                threading.Thread(target=shutil.rmtree, args=(trash, True), daemon=True).start()
+            
+            if failed:
+                self._send_response(500, 'application/json', {
+                    'status': 'error',
+                    'message': f'部分文件未能删除: {", ".join(failed)}',
+                    'failed': failed
+                })
+                return
             
             self._send_response(200, 'application/json', {
                 'status': 'success',
@@ -1224,7 +2407,7 @@ class FileTransferServer(BaseHTTPRequestHandler):
                 })
                 return
             
-            data = json.loads(self.rfile.read(content_length))
+            data = _loads(self.rfile.read(content_length))
             folder_name = data.get('name', '').strip()
             
             if not folder_name:
@@ -1233,9 +2416,16 @@ class FileTransferServer(BaseHTTPRequestHandler):
                     'message': '文件夹名称不能为空'
                 })
                 return
+            if not is_safe_name(folder_name):
+                self._send_response(400, 'application/json', {
+                    'status': 'error',
+                    'message': '无效的文件夹名称'
+                })
+                return
             
             folder_path = self.shared_dir / folder_name
             folder_path.mkdir(exist_ok=True)
+            invalidate_file_list()
             
             self._send_response(200, 'application/json', {
                 'status': 'success',
@@ -1251,26 +2441,35 @@ class FileTransferServer(BaseHTTPRequestHandler):
     def _get_server_info(self):
         """获取服务器信息"""
         try:
-            # 获取本机IP地址
-            hostname = socket.gethostname()
-            ip_address = socket.gethostbyname(hostname)
+            now = time.monotonic()
+            info = _INFO_CACHE['info']
+            if info is None or now - _INFO_CACHE['ts'] > DISK_USAGE_TTL:
+                # 获取本机IP地址
+                ip_address = get_local_ip()
+                
+                # 获取存储空间信息
+                total, used, free = get_disk_usage(self.base_dir)
+                
+                info = {
+                    'status': 'success',
+                    'hostname': socket.gethostname(),
+                    'ip_address': ip_address,
+                    'port': self.server.server_address[1],
+                    'server_url': f'http://{ip_address}:{self.server.server_address[1]}',
+                    'base_dir': str(self.base_dir),
+                    'total_space': self._format_bytes(total),
+                    'used_space': self._format_bytes(used),
+                    'free_space': self._format_bytes(free)
+                }
+                _INFO_CACHE['info'] = info
+                _INFO_CACHE['ts'] = now
             
-            # 获取存储空间信息
-            total, used, free = shutil.disk_usage(self.base_dir)
-            
-            self._send_response(200, 'application/json', {
-                'status': 'success',
-                'hostname': hostname,
-                'ip_address': ip_address,
-                'port': self.server.server_address[1],
-                'server_url': f'http://{ip_address}:{self.server.server_address[1]}',
-                'base_dir': str(self.base_dir),
-                'total_space': self._format_bytes(total),
-                'used_space': self._format_bytes(used),
-                'free_space': self._format_bytes(free),
-                'timestamp': time.time(),
-                'uptime': time.time() - self.server.start_time if hasattr(self.server, 'start_time') else 0
-            })
+            timestamp = time.time()
+            self._send_response(200, 'application/json', dict(
+                info,
+                timestamp=timestamp,
+                uptime=timestamp - self.server.start_time if hasattr(self.server, 'start_time') else 0
+            ))
             
         except Exception as e:
             self._send_response(500, 'application/json', {
@@ -1279,12 +2478,33 @@ class FileTransferServer(BaseHTTPRequestHandler):
             })
     
     def _format_bytes(self, bytes):
-        """格式化字节大小"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes < 1024.0:
-                return f"{bytes:.2f} {unit}"
-            bytes /= 1024.0
-        return f"{bytes:.2f} PB"
+        """格式化字节大小（单位由二进制位数直接查表得到）"""
+        i = min(max(0, (int(bytes).bit_length() - 1) // 10), len(_BYTE_SCALES) - 1)
+        scale, unit = _BYTE_SCALES[i]
+        return f"{bytes / scale:.2f} {unit}"
+
+
+class ThreadedFileServer(ThreadingHTTPServer):
+    """
+    多线程HTTP服务器，每个连接由独立的守护线程处理。
+    同时处理的请求数不超过 SERVER_WORKERS（名额由处理器在每个请求前后申请和归还），
+    接受连接的线程从不等待名额，空闲的保持连接也不会占满服务器。
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+    
+    def __init__(self, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(SERVER_WORKERS)
+        super().__init__(*args, **kwargs)
+    
+    def server_bind(self):
+        # 关闭Nagle算法避免小响应被延迟合并；加大收发缓冲区以跑满局域网带宽。
+        # 接收窗口的缩放系数在握手时确定，必须在 listen 之前设置到监听套接字上
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        super().server_bind()
 
 
 def get_available_port(start_port=8000, end_port=8100):
@@ -1299,8 +2519,34 @@ def get_available_port(start_port=8000, end_port=8100):
     return start_port  # 如果都不可用，返回起始端口
 
 
+LAN_IP_TTL = 30.0  # 局域网IP缓存时间（秒），网卡变化后最多延迟这么久生效
+DISK_USAGE_TTL = 5.0  # 磁盘空间信息缓存时间（秒）
+_LAN_IP_CACHE = {'ip': None, 'ts': 0.0}
+_DISK_USAGE_CACHE = {'usage': None, 'ts': 0.0}
+# /api/info 中除时间戳外的部分，与磁盘空间信息一起过期
+_INFO_CACHE = {'info': None, 'ts': 0.0}
+
+
 def get_local_ip():
-    """获取本机局域网IP地址"""
+    """获取本机局域网IP地址（结果缓存 LAN_IP_TTL 秒）"""
+    now = time.monotonic()
+    if _LAN_IP_CACHE['ip'] is None or now - _LAN_IP_CACHE['ts'] > LAN_IP_TTL:
+        _LAN_IP_CACHE['ip'] = _discover_local_ip()
+        _LAN_IP_CACHE['ts'] = now
+    return _LAN_IP_CACHE['ip']
+
+
+def get_disk_usage(path):
+    """获取存储空间信息 (total, used, free)，结果缓存 DISK_USAGE_TTL 秒"""
+    now = time.monotonic()
+    if _DISK_USAGE_CACHE['usage'] is None or now - _DISK_USAGE_CACHE['ts'] > DISK_USAGE_TTL:
+        _DISK_USAGE_CACHE['usage'] = shutil.disk_usage(path)
+        _DISK_USAGE_CACHE['ts'] = now
+    return _DISK_USAGE_CACHE['usage']
+
+
+def _discover_local_ip():
+    """探测本机局域网IP地址"""
     try:
         # 创建一个UDP套接字
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -1313,20 +2559,48 @@ def get_local_ip():
         return "127.0.0.1"
 
 
+@functools.lru_cache(maxsize=8)
+def _qr_matrix(url) -> tuple:
+    """计算网址对应的二维码模块矩阵（含边框），返回只读的布尔矩阵，同一网址只计算一次"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+@functools.lru_cache(maxsize=8)
+def _render_qr_svg(url) -> bytes:
+    """生成网址对应的二维码SVG，每行相邻的深色模块合并成一段路径"""
+    matrix = _qr_matrix(url)
+    size = len(matrix)
+    segments = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                segments.append(f'M{start} {y}h{x - start}v1h-{x - start}z')
+            else:
+                x += 1
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+            f'shape-rendering="crispEdges"><rect width="100%" height="100%" fill="#ffffff"/>'
+            f'<path fill="#667eea" d="{"".join(segments)}"/></svg>').encode('ascii')
+
+
 def generate_qr_code(url):
     """生成访问二维码"""
     try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
+        matrix = _qr_matrix(url)
         
-        # 在控制台打印二维码
-        qr.print_ascii()
+        # 在控制台打印二维码，每个模块占两个字符宽
+        print('\n'.join(''.join('██' if c else '  ' for c in row) for row in matrix))
         print("\n" + "="*50)
         
     except:
@@ -1347,23 +2621,25 @@ def main():
     url = f"http://{ip_address}:{port}"
     
     print(f"服务器启动中...")
-    print(f"文件存储目录: {Path(desktop_path) / 'FilePasser'}")
+    print(f"文件存储目录: {BASE_DIR}")
     print(f"访问地址: {url}")
     print("在手机浏览器中打开以上地址或扫码即可访问")
     print("请确保手机和电脑在同一Wi-Fi网络")
     print(f"局域网内其他设备可访问: {url}")
     print("\n" + "="*50)
 
-    time.sleep(2)
     print("文件将保存在桌面上的 \'FilePasser\' 文件夹中。\n")
-    time.sleep(3)
     # 生成二维码
     show_qrcode_as_image(url)
     try:
-        # 启动HTTP服务器
+        ensure_storage_dirs()
+        static_files()
+        
+        # 启动HTTP服务器（每个连接一个线程，上传和下载可以同时进行）
         server_address = ('0.0.0.0', port)
-        httpd = HTTPServer(server_address, FileTransferServer)
+        httpd = ThreadedFileServer(server_address, FileTransferServer)
         httpd.start_time = time.time()
+        watch_shared_dir(SHARED_DIR)
         
         print(f"服务器已启动!")
         print("\n按 Ctrl+C 停止服务器")
@@ -2,26 +2,50 @@ from flask import Flask, render_template_string, Response, jsonify, request
 import pyautogui
 import cv2
 import numpy as np
-from PIL import ImageGrab
+import mss
 import threading
 import time
-import io
 import base64
+import functools
+from io import BytesIO
 import json
 import os
 import qrcode
+import struct
 import subprocess
+import sys
 import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-def show_qrcode_as_image(url, filepath=None):
-    """
-    生成二维码图片，并尝试用系统默认程序打开。
-    
-    Args:
-        url: 要编码的网址
-        filepath: 图片保存路径（可选，默认保存在临时目录）
-    """
-    # 1. 生成二维码
+try:
+    # simplejpeg 直接调用 libjpeg-turbo，编码速度明显快于 OpenCV/Pillow
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+try:
+    # WebSocket 推流，未安装时客户端使用 MJPEG
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+try:
+    # waitress 是生产级的 WSGI 服务器，单次请求开销比 Flask 自带的开发服务器小得多
+    from waitress import serve
+except ImportError:
+    serve = None
+
+try:
+    # xxh3 用于比较图块是否变化，比 crc32 更快且几乎不会碰撞
+    import xxhash
+    _hash_bytes = xxhash.xxh3_64_intdigest
+except ImportError:
+    _hash_bytes = zlib.crc32
+
+@functools.lru_cache(maxsize=8)
+def _render_qr_png(url) -> bytes:
+    """生成网址对应的二维码PNG数据，同一网址只渲染一次"""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -32,6 +56,21 @@ def show_qrcode_as_image(url, filepath=None):
     qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def show_qrcode_as_image(url, filepath=None):
+    """
+    生成二维码图片，并尝试用系统默认程序打开。
+    
+    Args:
+        url: 要编码的网址
+        filepath: 图片保存路径（可选，默认保存在临时目录）
+    """
+    # 1. 生成二维码
+    png = _render_qr_png(url)
     
     # 2. 保存图片
     if filepath is None:
@@ -39,28 +78,302 @@ def show_qrcode_as_image(url, filepath=None):
         temp_dir = tempfile.gettempdir()
         filepath = os.path.join(temp_dir, "flowlink_qrcode.png")
     
-    img.save(filepath)
+    with open(filepath, 'wb') as f:
+        f.write(png)
     print(f"✓ 二维码已生成: {filepath}")
     print(f"链接: {url}")
     
     # 3. 尝试用系统默认程序打开图片
     try:
-        if os.name == 'nt':  # Windows
+        if os.name == 'nt':  # Windows，startfile 本身不会阻塞
             os.startfile(filepath)
-        elif os.name == 'posix':  # macOS 或 Linux
-            subprocess.run(['open', filepath] if sys.platform == 'darwin' else ['xdg-open', filepath], check=False)
+        elif os.name == 'posix':  # macOS 或 Linux，启动查看器后不等待它退出
+            opener = ['open'] if sys.platform == 'darwin' else ['xdg-open']
+            subprocess.Popen(opener + [filepath], stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, close_fds=True)
         print("已尝试自动打开二维码图片，请用手机扫描。")
     except Exception as e:
         print(f"无法自动打开图片，请手动查看: {filepath}")
     
     return filepath
 
+# 配置
+PORT = 5000
+HOST = '0.0.0.0'  # 监听所有网络接口
+# waitress 的线程池是固定大小的，MJPEG 视频流和增量长轮询会一直占着线程；
+# 限制它们的数量，并额外留出线程给点击、截图等短请求
+STREAM_CLIENTS_MAX = 8
+WAITRESS_THREADS = STREAM_CLIENTS_MAX + 8
+
 app = Flask(__name__)
+app.json.compact = True
+# WebSocket 依赖 Werkzeug 服务器的原始套接字，使用 waitress 时客户端改用 MJPEG
+sock = Sock(app) if Sock is not None and serve is None else None
+
+# pyautogui 默认每次操作后暂停0.1秒，远程点击不需要；
+# 点击屏幕角落时也不应触发 fail-safe 异常
+pyautogui.PAUSE = 0
+pyautogui.FAILSAFE = False
 
 # 存储最后一次屏幕截图
 last_screenshot = None
 screenshot_lock = threading.Lock()
 
+# mss 截屏对象不是线程安全的，所有截屏都通过这把锁串行化
+_sct = None
+_sct_lock = threading.Lock()
+
+
+def grab_screen():
+    """截取主显示器，返回 BGRA 格式的 ndarray（与 mss 共享内存，不做拷贝）"""
+    global _sct
+    with _sct_lock:
+        if _sct is None:
+            # 延迟到第一次截屏时创建，避免导入模块时就占用显示资源
+            _sct = mss.mss()
+        shot = _sct.grab(_sct.monitors[1])
+    return np.asarray(shot)
+
+
+# 每个线程复用自己的缩放/颜色转换输出缓冲区，避免每帧都分配几MB的新数组
+_buffers = threading.local()
+
+
+def _reusable_buffer(shape):
+    """返回当前线程中指定形状的 uint8 缓冲区，内容在下次同形状调用时会被覆盖"""
+    pool = getattr(_buffers, 'pool', None)
+    if pool is None or len(pool) > 8:
+        # 客户端分辨率不断变化时不让缓冲区无限增多
+        pool = _buffers.pool = {}
+    buf = pool.get(shape)
+    if buf is None:
+        buf = pool[shape] = np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+def scale_frame(frame, width):
+    """按目标宽度等比缩小帧，不放大；返回值在当前线程下次缩放到同尺寸前有效"""
+    scale = width / frame.shape[1]
+    if scale >= 1.0:
+        return frame
+    height = max(1, int(frame.shape[0] * scale))
+    dst = _reusable_buffer((height, width) + frame.shape[2:])
+    # INTER_AREA 缩小质量最好，且像素减少后 JPEG 编码量同比下降
+    return cv2.resize(frame, (width, height), dst=dst, interpolation=cv2.INTER_AREA)
+
+
+# 色度抽样方式 -> OpenCV 参数。420 字节数约为 444 的一半，但文字边缘会发虚
+_CV2_SAMPLING = {
+    '444': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+    '422': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    '420': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+}
+
+
+def parse_subsampling(value, default):
+    """解析客户端传入的色度抽样参数，非法值使用默认值"""
+    return value if value in _CV2_SAMPLING else default
+
+
+def encode_jpeg(frame, quality, subsampling='420'):
+    """将 BGR/BGRA 帧编码为 JPEG 字节"""
+    quality = max(10, min(100, int(quality)))
+    if simplejpeg is not None:
+        # BGRA 按 BGRX 处理，alpha 通道直接忽略，无需先转换颜色
+        colorspace = 'BGRX' if frame.shape[2] == 4 else 'BGR'
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(frame), quality=quality,
+                                      colorspace=colorspace, colorsubsampling=subsampling,
+                                      fastdct=True)
+    if frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=_reusable_buffer(frame.shape[:2] + (3,)))
+    ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality,
+                                           cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+                                           cv2.IMWRITE_JPEG_SAMPLING_FACTOR, _CV2_SAMPLING[subsampling]])
+    if not ok:
+        raise RuntimeError("JPEG 编码失败")
+    return buf.tobytes()
+
+
+# 后台截屏线程的帧率
+CAPTURE_FPS = 15
+# 某种画质超过这么久没有客户端请求，后台线程就不再为它编码
+DEMAND_TIMEOUT = 2.0
+
+# 最新一帧由后台线程统一截取并编码，所有客户端共享，
+# 客户端再多，每帧也只截一次屏、每种画质只编码一次
+_frame_cond = threading.Condition()
+_frame_seq = 0
+_frame_time = 0.0
+_latest_frame = None  # 当前帧的原始画面（BGRA），供增量模式切分图块
+_frame_digest = None  # 当前帧原始画面的哈希，画面不变时哈希不变
+_raw_demand = 0.0  # 最近一次请求原始画面的时间
+_latest_jpegs = {}  # (quality, width, subsampling) -> 当前帧的JPEG
+_wanted = {}  # (quality, width, subsampling) -> 最近一次被请求的时间
+_capture_error = None
+_capture_thread = None
+# 客户端请求了多种画质时并行编码，JPEG 编码在C代码中执行，不受GIL限制
+_encode_pool = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+
+
+def _encode_variant(frame, key):
+    """按 (quality, width, subsampling) 缩放并编码一帧"""
+    quality, width, subsampling = key
+    return encode_jpeg(scale_frame(frame, width), quality, subsampling)
+
+
+def _capture_loop():
+    """后台截屏线程：截屏后按客户端需要的画质各编码一次，再唤醒所有等待的客户端"""
+    global _frame_seq, _frame_time, _latest_frame, _frame_digest, _latest_jpegs, _capture_error
+    frame_time = 1.0 / CAPTURE_FPS
+    while True:
+        frame_start = time.time()
+        with _frame_cond:
+            for key, ts in list(_wanted.items()):
+                if frame_start - ts > DEMAND_TIMEOUT:
+                    del _wanted[key]
+            if not _wanted and frame_start - _raw_demand > DEMAND_TIMEOUT:
+                # 没有客户端时不截屏，等待新的请求
+                _frame_cond.wait(frame_time)
+                continue
+            keys = list(_wanted)
+            prev_digest, prev_jpegs = _frame_digest, _latest_jpegs
+        
+        try:
+            frame = grab_screen()
+            digest = _hash_bytes(frame)
+            # 画面与上一帧完全相同时直接复用已有的编码结果，只编码新出现的画质
+            jpegs = {key: prev_jpegs[key] for key in keys
+                     if digest == prev_digest and key in prev_jpegs}
+            missing = [key for key in keys if key not in jpegs]
+            if len(missing) == 1:
+                jpegs[missing[0]] = _encode_variant(frame, missing[0])
+            elif missing:
+                jpegs.update(zip(missing, _encode_pool.map(lambda key: _encode_variant(frame, key), missing)))
+        except Exception as e:
+            print(f"截图错误: {e}")
+            with _frame_cond:
+                _capture_error = e
+                _frame_cond.notify_all()
+            time.sleep(1)
+            continue
+        
+        with _frame_cond:
+            _latest_frame = frame
+            _frame_digest = digest
+            _latest_jpegs = jpegs
+            _frame_seq += 1
+            _frame_time = time.time()
+            _capture_error = None
+            _frame_cond.notify_all()
+        
+        time.sleep(max(0.0, frame_time - (time.time() - frame_start)))
+
+
+def _ensure_capture_thread():
+    """第一次有客户端请求画面时启动后台截屏线程"""
+    global _capture_thread
+    with _frame_cond:
+        if _capture_thread is None:
+            _capture_thread = threading.Thread(target=_capture_loop, daemon=True)
+            _capture_thread.start()
+
+
+def _wait_for_frame(ready, timeout):
+    """在持有 _frame_cond 的情况下等待 ready() 成立，截屏出错或超时则抛出异常"""
+    if ready():
+        return
+    # 唤醒可能处于空闲等待中的截屏线程
+    _frame_cond.notify_all()
+    if not _frame_cond.wait_for(lambda: ready() or _capture_error is not None, timeout):
+        raise RuntimeError("等待截图超时")
+    if not ready():
+        raise _capture_error
+
+
+def get_frame(after_seq=0, timeout=2.0):
+    """获取最新一帧原始画面，返回 (帧序号, BGRA帧)，参数同 get_jpeg"""
+    global _raw_demand
+    _ensure_capture_thread()
+    stale = 2.0 / CAPTURE_FPS
+    
+    def ready():
+        return (_frame_seq > after_seq and _latest_frame is not None
+                and time.time() - _frame_time < stale)
+    
+    with _frame_cond:
+        _raw_demand = time.time()
+        _wait_for_frame(ready, timeout)
+        return _frame_seq, _latest_frame
+
+
+def get_jpeg(quality, width, subsampling='420', after_seq=0, timeout=2.0):
+    """
+    获取最新一帧指定画质的JPEG。
+    
+    Args:
+        quality: JPEG质量
+        width: 目标宽度
+        subsampling: 色度抽样方式，'444'/'422'/'420'
+        after_seq: 只返回序号大于该值的帧，用于视频流等待下一帧
+        timeout: 等待新帧的最长时间（秒）
+    
+    Returns:
+        (帧序号, 原始画面哈希, JPEG字节)
+    """
+    _ensure_capture_thread()
+    key = (max(10, min(100, int(quality))), int(width), subsampling)
+    stale = 2.0 / CAPTURE_FPS
+    
+    def ready():
+        return (_frame_seq > after_seq and key in _latest_jpegs
+                and time.time() - _frame_time < stale)
+    
+    with _frame_cond:
+        _wanted[key] = time.time()
+        _wait_for_frame(ready, timeout)
+        return _frame_seq, _frame_digest, _latest_jpegs[key]
+
+
+# 增量模式的图块边长（像素）
+TILE_SIZE = 64
+# 增量模式客户端超过这么久没有请求就丢弃其状态
+DELTA_CLIENT_TIMEOUT = 60.0
+
+# 客户端ID -> (帧序号, 宽度, 各图块哈希)，记录每个客户端已经拿到的画面
+_delta_clients = {}
+_delta_lock = threading.Lock()
+
+
+def tile_hashes(frame):
+    """按 TILE_SIZE 切分帧并计算每个图块的哈希，返回二维列表 [行][列]"""
+    h, w = frame.shape[:2]
+    return [[_hash_bytes(frame[y:y + TILE_SIZE, x:x + TILE_SIZE].tobytes())
+             for x in range(0, w, TILE_SIZE)]
+            for y in range(0, h, TILE_SIZE)]
+
+
+def encode_delta(frame, hashes, prev_hashes, quality, subsampling):
+    """
+    只编码与上一帧相比发生变化的图块。
+    
+    返回的二进制格式（小端）：
+        图块数 u32，随后每个图块为 行号 u16、列号 u16、长度 u32、JPEG数据
+    prev_hashes 为 None 时返回全部图块。
+    """
+    parts = [b'']
+    count = 0
+    for ty, row in enumerate(hashes):
+        for tx, digest in enumerate(row):
+            if prev_hashes is not None and prev_hashes[ty][tx] == digest:
+                continue
+            tile = frame[ty * TILE_SIZE:(ty + 1) * TILE_SIZE, tx * TILE_SIZE:(tx + 1) * TILE_SIZE]
+            jpeg = encode_jpeg(tile, quality, subsampling)
+            parts.append(struct.pack('<HHI', ty, tx, len(jpeg)))
+            parts.append(jpeg)
+            count += 1
+    parts[0] = struct.pack('<I', count)
+    return b''.join(parts)
+
 # HTML界面模板
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -112,7 +425,7 @@ HTML_TEMPLATE = '''
             margin-top: 20px;
             text-align: center;
         }
-        #screen {
+        #screen, #screen-canvas {
             max-width: 100%;
             border-radius: 5px;
             cursor: pointer;
@@ -155,6 +468,7 @@ HTML_TEMPLATE = '''
             <div class="mode-selector">
                 <button class="mode-btn active" onclick="setMode('stream')">实时流</button>
                 <button class="mode-btn" onclick="setMode('screenshot')">截图模式</button>
+                <button class="mode-btn" onclick="setMode('delta')">增量模式</button>
             </div>
             
             <button onclick="captureScreen()">手动截图</button>
@@ -172,6 +486,7 @@ HTML_TEMPLATE = '''
         <div class="screen-container">
             <img id="screen" src="" onclick="toggleFullscreen(this)" 
                  alt="电脑屏幕将显示在这里">
+            <canvas id="screen-canvas" onclick="toggleFullscreen(this)" style="display: none;"></canvas>
         </div>
         
         <div class="info">
@@ -182,9 +497,23 @@ HTML_TEMPLATE = '''
 
     <script>
         let currentMode = 'stream';
-        let streamInterval = null;
+        let polling = false;
+        let socket = null;
+        let frameUrl = null;
+        let lastEtag = null;
+        // 待显示的帧，超过上限时丢弃最旧的，网络或解码慢时不会堆积
+        const frameQueue = [];
+        const MAX_QUEUE_SIZE = 2;
+        let drawing = false;
         let isStreaming = false;
         let quality = 70;
+        const targetFps = 15;
+        // 按手机屏幕的物理像素宽度请求画面，服务器会先缩小再编码
+        const targetWidth = Math.min(1920, Math.round(window.innerWidth * (window.devicePixelRatio || 1)));
+        // 增量模式下服务器按客户端ID记录已经发送过的画面
+        const clientId = Math.random().toString(36).slice(2);
+        let deltaRunning = false;
+        let deltaAbort = null;
         let clickEnabled = true;
         let lastTouch = null;
         
@@ -209,13 +538,30 @@ HTML_TEMPLATE = '''
             if (mode === 'stream' && !isStreaming) {
                 toggleStream();
             }
+            
+            if (mode === 'delta') {
+                if (isStreaming) {
+                    toggleStream();
+                }
+                deltaLoop();
+            } else if (deltaAbort) {
+                // 离开增量模式时取消还在等待的请求，服务器不必再为它等新画面
+                deltaAbort.abort();
+            }
+            
+            // 增量模式画在canvas上，其他模式显示图片
+            document.getElementById('screen').style.display = mode === 'delta' ? 'none' : '';
+            document.getElementById('screen-canvas').style.display = mode === 'delta' ? '' : 'none';
         }
         
         function toggleStream() {
             if (isStreaming) {
-                clearInterval(streamInterval);
+                polling = false;
+                closeSocket();
                 document.querySelector('button[onclick="toggleStream()"]').textContent = '开始实时流';
                 isStreaming = false;
+                // 换成一张静态截图，同时断开MJPEG连接
+                updateScreen();
             } else {
                 document.querySelector('button[onclick="toggleStream()"]').textContent = '停止实时流';
                 isStreaming = true;
@@ -224,28 +570,112 @@ HTML_TEMPLATE = '''
         }
         
         function startStream() {
-            if (currentMode === 'stream') {
-                updateScreen();
-                streamInterval = setInterval(updateScreen, 100);
+            if (currentMode !== 'stream') return;
+            closeSocket();
+            if (!window.WebSocket) {
+                startMjpeg();
+                return;
+            }
+            // 优先使用WebSocket，每帧只有几个字节的帧头开销
+            const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+            const ws = new WebSocket(`${protocol}://${location.host}/ws?q=${quality}&w=${targetWidth}&fps=${targetFps}`);
+            ws.binaryType = 'arraybuffer';
+            ws.onmessage = e => queueFrame(new Blob([e.data], {type: 'image/jpeg'}));
+            ws.onclose = () => {
+                // 服务器不支持WebSocket或连接断开时退回MJPEG
+                socket = null;
+                if (isStreaming && currentMode === 'stream') startMjpeg();
+            };
+            socket = ws;
+        }
+        
+        function closeSocket() {
+            if (socket) {
+                socket.onclose = null;
+                socket.close();
+                socket = null;
+            }
+        }
+        
+        function startMjpeg() {
+            // MJPEG长连接，所有帧复用同一个TCP连接
+            const img = document.getElementById('screen');
+            img.onerror = fallbackToPolling;
+            img.src = `/screen_video?q=${quality}&w=${targetWidth}&fps=${targetFps}&t=${Date.now()}`;
+        }
+        
+        async function showFrame(blob) {
+            // 等新帧解码完成再释放上一帧的blob URL，避免内存持续增长
+            const img = document.getElementById('screen');
+            const url = URL.createObjectURL(blob);
+            img.src = url;
+            try {
+                await img.decode();
+            } catch (error) {
+                // 图片被下一帧替换时decode会失败，忽略即可
+            }
+            if (frameUrl) URL.revokeObjectURL(frameUrl);
+            frameUrl = url;
+        }
+        
+        function queueFrame(blob) {
+            frameQueue.push(blob);
+            if (frameQueue.length > MAX_QUEUE_SIZE) {
+                frameQueue.shift();
             }
+            if (!drawing) drawFrames();
+        }
+        
+        async function drawFrames() {
+            // 一帧显示完成后才取下一帧
+            drawing = true;
+            while (frameQueue.length) {
+                await showFrame(frameQueue.shift());
+            }
+            drawing = false;
+        }
+        
+        function fallbackToPolling() {
+            // 浏览器不支持MJPEG时退回逐帧请求
+            const img = document.getElementById('screen');
+            img.onerror = null;
+            if (!isStreaming || polling) return;
+            pollLoop();
+        }
+        
+        async function pollLoop() {
+            // 上一帧显示完成才请求下一帧，服务器或网络慢时请求不会堆积
+            polling = true;
+            while (polling && isStreaming) {
+                const startTime = Date.now();
+                await updateScreen();
+                const wait = 1000 / targetFps - (Date.now() - startTime);
+                if (wait > 0) {
+                    await new Promise(resolve => setTimeout(resolve, wait));
+                }
+            }
+            polling = false;
         }
         
         function updateScreen() {
             const startTime = Date.now();
-            const img = document.getElementById('screen');
             const timestamp = new Date().getTime();
             
-            fetch(`/screen?mode=${currentMode}&q=${quality}&t=${timestamp}`)
-                .then(response => response.blob())
-                .then(blob => {
-                    const url = URL.createObjectURL(blob);
-                    img.src = url;
-                    
+            // 带上上一帧的ETag，画面没有变化时服务器返回304
+            const headers = lastEtag ? {'If-None-Match': lastEtag} : {};
+            return fetch(`/screen?mode=${currentMode}&q=${quality}&w=${targetWidth}&t=${timestamp}`, {headers})
+                .then(response => {
+                    if (response.status === 304) return null;
+                    lastEtag = response.headers.get('ETag');
+                    return response.blob();
+                })
+                .then(blob => blob && showFrame(blob))
+                .then(() => {
                     // 更新延迟信息
-                    const latency = Date.now() - startTime;
-                    document.getElementById('latency').textContent = latency;
-                    document.getElementById('last-update').textContent = 
-                        new Date().toLocaleTimeString();
+                    const latency = document.getElementById('latency');
+                    const lastUpdate = document.getElementById('last-update');
+                    if (latency) latency.textContent = Date.now() - startTime;
+                    if (lastUpdate) lastUpdate.textContent = new Date().toLocaleTimeString();
                 })
                 .catch(error => {
                     console.error('更新失败:', error);
@@ -256,19 +686,80 @@ HTML_TEMPLATE = '''
             updateScreen();
         }
         
+        async function deltaLoop() {
+            // 增量模式：服务器只返回变化的图块，逐块画到canvas上。
+            // 同一时间只能有一个循环，否则两个循环共用 cid 会互相覆盖服务器上的状态
+            if (deltaRunning) return;
+            deltaRunning = true;
+            const canvas = document.getElementById('screen-canvas');
+            const ctx = canvas.getContext('2d');
+            try {
+                await deltaLoopBody(canvas, ctx);
+            } finally {
+                deltaRunning = false;
+                deltaAbort = null;
+            }
+        }
+        
+        async function deltaLoopBody(canvas, ctx) {
+            while (currentMode === 'delta') {
+                try {
+                    deltaAbort = new AbortController();
+                    const response = await fetch(`/delta?cid=${clientId}&q=${quality}&w=${targetWidth}`,
+                                                 {signal: deltaAbort.signal});
+                    if (!response.ok) throw new Error('HTTP ' + response.status);
+                    const width = Number(response.headers.get('X-Frame-Width'));
+                    const height = Number(response.headers.get('X-Frame-Height'));
+                    const tileSize = Number(response.headers.get('X-Tile-Size'));
+                    if (canvas.width !== width || canvas.height !== height) {
+                        // 尺寸变化时服务器会返回全部图块
+                        canvas.width = width;
+                        canvas.height = height;
+                    }
+                    
+                    const buffer = await response.arrayBuffer();
+                    const view = new DataView(buffer);
+                    const count = view.getUint32(0, true);
+                    let offset = 4;
+                    const draws = [];
+                    for (let i = 0; i < count; i++) {
+                        const ty = view.getUint16(offset, true);
+                        const tx = view.getUint16(offset + 2, true);
+                        const length = view.getUint32(offset + 4, true);
+                        offset += 8;
+                        const blob = new Blob([new Uint8Array(buffer, offset, length)], {type: 'image/jpeg'});
+                        offset += length;
+                        draws.push(createImageBitmap(blob).then(bitmap => {
+                            ctx.drawImage(bitmap, tx * tileSize, ty * tileSize);
+                            bitmap.close();
+                        }));
+                    }
+                    await Promise.all(draws);
+                } catch (error) {
+                    if (error.name === 'AbortError') continue;  // 已切换到其他模式
+                    console.error('更新失败:', error);
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                }
+            }
+        }
+        
         function refreshScreen() {
             const timestamp = new Date().getTime();
             const img = document.getElementById('screen');
-            img.src = `/screen?mode=screenshot&t=${timestamp}`;
+            img.src = `/screen?mode=screenshot&w=${targetWidth}&t=${timestamp}`;
         }
         
         function updateQuality() {
             quality = document.getElementById('quality').value;
             document.getElementById('quality-value').textContent = quality + '%';
+            // MJPEG连接的参数在建立时确定，调整质量后需要重连
+            if (isStreaming && !polling) {
+                startStream();
+            }
         }
         
         function fullScreen() {
-            const elem = document.getElementById('screen');
+            const elem = document.getElementById(currentMode === 'delta' ? 'screen-canvas' : 'screen');
             if (elem.requestFullscreen) {
                 elem.requestFullscreen();
             } else if (elem.webkitRequestFullscreen) {
@@ -286,37 +777,40 @@ HTML_TEMPLATE = '''
             }
         }
         
-        // 触摸控制
-        const screenImg = document.getElementById('screen');
-        
-        screenImg.addEventListener('touchstart', function(e) {
-            if (!clickEnabled) return;
-            lastTouch = {x: e.touches[0].clientX, y: e.touches[0].clientY};
-        });
-        
-        screenImg.addEventListener('touchmove', function(e) {
-            e.preventDefault();
-        });
-        
-        screenImg.addEventListener('touchend', function(e) {
-            if (!clickEnabled || !lastTouch) return;
+        // 触摸控制，图片和canvas共用
+        function bindTouchControl(screenElem) {
+            screenElem.addEventListener('touchstart', function(e) {
+                if (!clickEnabled) return;
+                lastTouch = {x: e.touches[0].clientX, y: e.touches[0].clientY};
+            });
             
-            const touch = e.changedTouches[0];
-            const rect = screenImg.getBoundingClientRect();
+            screenElem.addEventListener('touchmove', function(e) {
+                e.preventDefault();
+            });
             
-            // 计算相对位置
-            const x = (touch.clientX - rect.left) / rect.width;
-            const y = (touch.clientY - rect.top) / rect.height;
+            screenElem.addEventListener('touchend', function(e) {
+                if (!clickEnabled || !lastTouch) return;
+                
+                const touch = e.changedTouches[0];
+                const rect = screenElem.getBoundingClientRect();
             
-            // 发送点击位置到服务器
-            fetch('/click', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({x: x, y: y})
+                // 计算相对位置
+                const x = (touch.clientX - rect.left) / rect.width;
+                const y = (touch.clientY - rect.top) / rect.height;
+                
+                // 发送点击位置到服务器
+                fetch('/click', {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({x: x, y: y})
+                });
+                
+                lastTouch = null;
             });
-            
-            lastTouch = null;
-        });
+        }
+        
+        bindTouchControl(document.getElementById('screen'));
+        bindTouchControl(document.getElementById('screen-canvas'));
         
         // 键盘快捷键
         document.addEventListener('keydown', function(e) {
@@ -354,53 +848,117 @@ def get_ip():
         ip = "127.0.0.1"
     return jsonify({'ip': ip, 'port': PORT})
 
-def generate_screenshot():
-    """生成屏幕截图"""
+def iter_frames(quality=85, width=1280, fps=10, subsampling='420'):
+    """按目标帧率持续产出JPEG帧，供MJPEG和WebSocket推流共用"""
+    frame_time = 1.0 / fps
+    seq = 0
     while True:
         try:
-            # 截取屏幕
-            screenshot = ImageGrab.grab()
-            
-            # 转换为JPEG
-            img_byte_arr = io.BytesIO()
-            screenshot.save(img_byte_arr, format='JPEG', quality=85)
-            img_byte_arr = img_byte_arr.getvalue()
-            
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + img_byte_arr + b'\r\n')
-            
-            time.sleep(0.1)  # 10FPS
+            frame_start = time.time()
+            # 等待后台线程产出的下一帧，慢客户端自然跳过中间帧
+            seq, _, img_byte_arr = get_jpeg(quality, width, subsampling, after_seq=seq)
         except Exception as e:
             print(f"截图错误: {e}")
             time.sleep(1)
+            continue
+        
+        yield img_byte_arr
+        
+        # 扣除等待和发送的耗时，尽量贴近目标帧率
+        time.sleep(max(0.0, frame_time - (time.time() - frame_start)))
+
+_stream_slots = threading.BoundedSemaphore(STREAM_CLIENTS_MAX)
+
+
+def acquire_stream_slot():
+    """申请一个视频流名额；开发服务器每个请求一个线程，不需要限制"""
+    return serve is None or _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot():
+    if serve is not None:
+        _stream_slots.release()
+
+
+def _streams_full():
+    return jsonify({'status': 'error', 'message': '同时观看的人数已满，请稍后再试'}), 503
+
+
+def generate_screenshot(quality=85, width=1280, fps=10, subsampling='420'):
+    """生成屏幕截图"""
+    for img_byte_arr in iter_frames(quality, width, fps, subsampling):
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + img_byte_arr + b'\r\n')
 
 @app.route('/screen')
 def screen():
     """获取屏幕截图"""
     mode = request.args.get('mode', 'stream')
     quality = int(request.args.get('q', 70))
+    width = max(160, int(request.args.get('w', 1280)))
+    # 截图模式以看清文字为主，默认不做色度抽样；实时流以带宽为主，默认 420
+    subsampling = parse_subsampling(request.args.get('sub'), '444' if mode == 'screenshot' else '420')
     
     try:
-        # 截取屏幕
-        screenshot = ImageGrab.grab()
-        
-        # 调整质量
-        img_byte_arr = io.BytesIO()
-        screenshot.save(img_byte_arr, format='JPEG', quality=max(10, min(100, quality)))
-        img_bytes = img_byte_arr.getvalue()
+        # 直接取后台线程最新一帧，缩放和编码已由后台线程完成
+        _, digest, img_bytes = get_jpeg(quality, width, subsampling)
         
-        return Response(img_bytes, mimetype='image/jpeg')
+        # 画面没有变化时返回304，客户端无需重新下载和解码
+        etag = f'"{digest:x}-{quality}-{width}-{subsampling}"'
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers={'ETag': etag})
+        response = Response(img_bytes, mimetype='image/jpeg')
+        response.headers['ETag'] = etag
+        return response
     except Exception as e:
         print(f"截图失败: {e}")
-        # 返回错误图片
-        from PIL import Image, ImageDraw
-        img = Image.new('RGB', (800, 600), color='red')
-        d = ImageDraw.Draw(img)
-        d.text((10, 10), f"截图失败: {str(e)}", fill='white')
-        
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='JPEG')
-        return Response(img_byte_arr.getvalue(), mimetype='image/jpeg')
+        # 返回错误图片（cv2.putText 不支持中文，错误信息用英文绘制）
+        img = np.zeros((600, 800, 3), dtype=np.uint8)
+        img[:] = (0, 0, 255)
+        cv2.putText(img, f"Capture failed: {str(e)[:60]}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        return Response(encode_jpeg(img, 85), mimetype='image/jpeg')
+
+@app.route('/delta')
+def delta():
+    """增量画面：只返回该客户端上次拿到的画面之后发生变化的图块"""
+    client_id = request.args.get('cid', '')
+    quality = int(request.args.get('q', 70))
+    width = max(160, int(request.args.get('w', 1280)))
+    subsampling = parse_subsampling(request.args.get('sub'), '420')
+    
+    now = time.time()
+    with _delta_lock:
+        for cid, state in list(_delta_clients.items()):
+            if now - state[3] > DELTA_CLIENT_TIMEOUT:
+                del _delta_clients[cid]
+        last_seq, last_width, prev_hashes, _ = _delta_clients.get(client_id, (0, None, None, 0))
+    
+    # 等待新画面时会占着线程，和视频流共用名额
+    if not acquire_stream_slot():
+        return _streams_full()
+    try:
+        # 等待比客户端已有画面更新的一帧，画面没有变化时也不会空转
+        seq, frame = get_frame(after_seq=last_seq)
+        frame = scale_frame(frame, width)
+        hashes = tile_hashes(frame)
+        if last_width != width or prev_hashes is None or len(prev_hashes) != len(hashes):
+            prev_hashes = None
+        body = encode_delta(frame, hashes, prev_hashes, quality, subsampling)
+    except Exception as e:
+        print(f"截图失败: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    finally:
+        release_stream_slot()
+    
+    with _delta_lock:
+        _delta_clients[client_id] = (seq, width, hashes, now)
+    
+    response = Response(body, mimetype='application/octet-stream')
+    response.headers['X-Frame-Width'] = str(frame.shape[1])
+    response.headers['X-Frame-Height'] = str(frame.shape[0])
+    response.headers['X-Tile-Size'] = str(TILE_SIZE)
+    return response
 
 @app.route('/click', methods=['POST'])
 def handle_click():
@@ -411,16 +969,14 @@ def handle_click():
         y = data.get('y', 0)
         
         # 获取屏幕尺寸
-        import pyautogui
         screen_width, screen_height = pyautogui.size()
         
         # 计算实际坐标
         click_x = int(x * screen_width)
         click_y = int(y * screen_height)
         
-        # 移动鼠标并点击
-        pyautogui.moveTo(click_x, click_y, duration=0.1)
-        pyautogui.click()
+        # 直接在目标位置点击，不做移动动画，不占用工作线程
+        pyautogui.click(click_x, click_y, _pause=False)
         
         return jsonify({'status': 'success', 'x': click_x, 'y': click_y})
     except Exception as e:
@@ -429,8 +985,29 @@ def handle_click():
 @app.route('/screen_video')
 def screen_video():
     """视频流端点"""
-    return Response(generate_screenshot(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    quality = int(request.args.get('q', 85))
+    width = max(160, int(request.args.get('w', 1280)))
+    fps = max(1, min(30, int(request.args.get('fps', 10))))
+    subsampling = parse_subsampling(request.args.get('sub'), '420')
+    if not acquire_stream_slot():
+        return _streams_full()
+    response = Response(generate_screenshot(quality, width, fps, subsampling),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    # 客户端断开后服务器关闭响应时归还名额（生成器还没开始迭代时也会调用）
+    response.call_on_close(release_stream_slot)
+    return response
+
+def screen_ws(ws):
+    """WebSocket 视频流：每帧作为一条二进制消息推送，连接断开时 send 抛出异常结束循环"""
+    quality = int(request.args.get('q', 85))
+    width = max(160, int(request.args.get('w', 1280)))
+    fps = max(1, min(30, int(request.args.get('fps', 10))))
+    subsampling = parse_subsampling(request.args.get('sub'), '420')
+    for img_byte_arr in iter_frames(quality, width, fps, subsampling):
+        ws.send(img_byte_arr)
+
+if sock is not None:
+    sock.route('/ws')(screen_ws)
 
 @app.route('/info')
 def server_info():
@@ -460,20 +1037,30 @@ def get_local_ip():
         return "127.0.0.1"
     
     
+@functools.lru_cache(maxsize=8)
+def _qr_matrix(url) -> np.ndarray:
+    """计算网址对应的二维码模块矩阵（含边框），返回只读布尔矩阵，同一网址只计算一次"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    matrix = np.array(qr.get_matrix(), dtype=bool)
+    # 缓存的矩阵会被多次返回，设为只读防止调用方改坏缓存
+    matrix.flags.writeable = False
+    return matrix
+
+
 def generate_qr_code(url):
     """生成访问二维码"""
     try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-        
-        # 在控制台打印二维码
-        qr.print_ascii()
+        matrix = _qr_matrix(url)
+        
+        # 在控制台打印二维码，每个模块占两个字符宽
+        print('\n'.join(''.join('██' if c else '  ' for c in row) for row in matrix))
         print("\n" + "="*50)
         
     except:
@@ -481,10 +1068,6 @@ def generate_qr_code(url):
 
 
 def main():
-    # 配置
-    PORT = 5000
-    HOST = '0.0.0.0'  # 监听所有网络接口
-    
     local_ip = get_local_ip()
 
     print("=" * 50)
@@ -507,4 +1090,7 @@ def main():
     show_qrcode_as_image(f"http://{local_ip}:{PORT}")
     
     # 启动服务器
-    app.run(host=HOST, port=PORT, debug=False, threaded=True)
\ No newline at end of file
+    if serve is not None:
+        serve(app, host=HOST, port=PORT, threads=WAITRESS_THREADS, connection_limit=100, channel_timeout=30)
+    else:
+        app.run(host=HOST, port=PORT, debug=False, threaded=True)
\ No newline at end of file
@@ -3,10 +3,30 @@ import subprocess
 import numpy as np
 import tempfile
 import os
+import re
+import struct
 import time
 import threading
 from queue import Queue, Empty
 
+try:
+    # PyAV 用于解码 screenrecord 输出的 H.264 视频流
+    import av
+except ImportError:
+    av = None
+
+ADB_PATH = "./platform-tools/adb.exe"
+
+# screencap 原始输出的像素格式 -> BGR 转换方式（只支持每像素4字节的格式）
+_PIXEL_FORMATS = {
+    1: cv2.COLOR_RGBA2BGR,  # RGBA_8888
+    2: cv2.COLOR_RGBA2BGR,  # RGBX_8888
+    5: cv2.COLOR_BGRA2BGR,  # BGRA_8888
+}
+
+# screenrecord 连续这么多次没有解码出画面，就认为设备不支持，改用 screencap
+H264_MAX_FAILURES = 3
+
 class ScreenCaptureThread(threading.Thread):
     def __init__(self, target_width=480, max_queue_size=2):
         threading.Thread.__init__(self)
@@ -14,59 +34,125 @@ class ScreenCaptureThread(threading.Thread):
         self.frame_queue = Queue(maxsize=max_queue_size)
         self.running = True
         self.daemon = True
+        # 常驻的 adb shell，避免每帧都启动一个 adb 进程
+        self._shell = None
+        self._use_shell = True
+        self._header_size = 12
         
     def run(self):
         while self.running:
             try:
                 frame = self.get_screenshot_with_size(self.target_width)
                 if frame is not None:
-                    # 如果队列已满，丢弃旧帧
-                    if self.frame_queue.full():
-                        try:
-                            self.frame_queue.get_nowait()
-                        except Empty:
-                            pass
-                    self.frame_queue.put(frame)
+                    self._put_frame(frame)
                 # 短暂休眠避免过度占用CPU
                 time.sleep(0.01)
             except Exception as e:
                 time.sleep(0.1)
     
+    def _put_frame(self, frame):
+        """放入新帧，如果队列已满，丢弃旧帧"""
+        # 保证是连续内存，imshow 时不会再拷贝一次
+        frame = np.ascontiguousarray(frame)
+        if self.frame_queue.full():
+            try:
+                self.frame_queue.get_nowait()
+            except Empty:
+                pass
+        self.frame_queue.put(frame)
+    
+    def _exec_out_screencap(self):
+        """通过 exec-out 执行一次 screencap，返回 (宽, 高, 像素格式, 像素数据)"""
+        # 不加 -p 直接输出原始帧缓冲，省去手机端 PNG 编码和电脑端解码；
+        # 直接读取管道，不经过 subprocess.run 的读线程和 CompletedProcess
+        proc = subprocess.Popen(
+            [ADB_PATH, "exec-out", "screencap"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+        )
+        # 设备无响应时结束 adb 进程，read 随之返回
+        timer = threading.Timer(5, proc.kill)
+        timer.start()
+        try:
+            raw = proc.stdout.read()
+        finally:
+            timer.cancel()
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0 or len(raw) < 12:
+            raise RuntimeError("screencap 执行失败")
+        # 头部为 宽、高、像素格式 各4字节，Android 12 起还多一个4字节的色彩空间，
+        # 用总长度减去像素数据长度即可得到头部长度
+        w, h, fmt = struct.unpack_from("<III", raw)
+        self._header_size = len(raw) - w * h * 4
+        return w, h, fmt, memoryview(raw)[self._header_size:]
+    
+    def _open_shell(self):
+        """启动常驻的 adb shell，并探测 screencap 原始数据的头部长度"""
+        self._exec_out_screencap()
+        self._shell = subprocess.Popen(
+            [ADB_PATH, "shell"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, bufsize=0
+        )
+    
+    def _close_shell(self):
+        """关闭常驻的 adb shell"""
+        if self._shell is not None:
+            try:
+                self._shell.kill()
+                self._shell.wait(timeout=1)
+            except Exception:
+                pass
+            self._shell = None
+    
+    def _read_exact(self, size):
+        """从 adb shell 的输出中读取指定长度的数据"""
+        buf = bytearray(size)
+        view = memoryview(buf)
+        pos = 0
+        while pos < size:
+            n = self._shell.stdout.readinto(view[pos:])
+            if not n:
+                raise EOFError("adb shell 已断开")
+            pos += n
+        return buf
+    
+    def _shell_screencap(self):
+        """通过常驻的 adb shell 执行一次 screencap，返回值同 _exec_out_screencap"""
+        if self._shell is None or self._shell.poll() is not None:
+            self._open_shell()
+        
+        self._shell.stdin.write(b"screencap\n")
+        header = self._read_exact(self._header_size)
+        w, h, fmt = struct.unpack_from("<III", header)
+        if fmt not in _PIXEL_FORMATS or not 0 < w * h <= 8192 * 8192:
+            # 部分设备的 adb shell 会改写输出中的换行符，数据流已错位，
+            # 以后改用每帧一次的 exec-out
+            self._use_shell = False
+            raise RuntimeError("adb shell 输出不是完整的二进制数据")
+        return w, h, fmt, self._read_exact(w * h * 4)
+    
     def get_screenshot_with_size(self, width=480):
         """获取指定宽度的截图 - 优化分辨率以提高帧率"""
         try:
-            # 获取设备分辨率
-            result = subprocess.run(
-                ["./platform-tools/adb.exe", "shell", "wm", "size"],
-                capture_output=True, text=True, timeout=2
-            )
+            if self._use_shell:
+                w, h, fmt, data = self._shell_screencap()
+            else:
+                w, h, fmt, data = self._exec_out_screencap()
             
-            if "Physical size" in result.stdout:
-                size_str = result.stdout.split(": ")[1].strip()
-                w, h = map(int, size_str.split("x"))
-                
-                # 大幅降低分辨率以提高帧率 [1,7](@ref)
-                scale = width / w
-                height = int(h * scale)
-                
-                # 使用内存流避免文件IO
-                screenshot_result = subprocess.run(
-                    ["./platform-tools/adb.exe", "exec-out", "screencap", "-p"],
-                    capture_output=True, timeout=2
-                )
-                
-                if screenshot_result.returncode == 0:
-                    # 直接从内存解码图像
-                    img_array = np.frombuffer(screenshot_result.stdout, dtype=np.uint8)
-                    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                    
-                    if img is not None:
-                        # 调整到目标分辨率 [1](@ref)
-                        img = cv2.resize(img, (width, height))
-                        return img
-                        
-            return None
+            if fmt not in _PIXEL_FORMATS:
+                raise RuntimeError(f"不支持的像素格式: {fmt}")
+            img = np.frombuffer(data, dtype=np.uint8).reshape(h, w, 4)
+            
+            # 大幅降低分辨率以提高帧率 [1,7](@ref)，帧头里的宽高已经包含屏幕旋转；
+            # 先缩小再转换颜色，转换的像素更少，手机分辨率不超过目标宽度时不缩放
+            if w > width:
+                height = int(h * width / w)
+                img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+            # cvtColor 输出新的连续数组，不再引用 adb 读取缓冲区
+            return cv2.cvtColor(img, _PIXEL_FORMATS[fmt])
         except Exception as e:
+            self._close_shell()
             return None
     
     def get_latest_frame(self):
@@ -78,12 +164,103 @@ class ScreenCaptureThread(threading.Thread):
     def stop(self):
         """停止线程"""
         self.running = False
+        self._close_shell()
+
+class H264CaptureThread(ScreenCaptureThread):
+    """通过 screenrecord 获取 H.264 视频流并解码，画面静止时几乎不占带宽和CPU"""
+    
+    def __init__(self, target_width=480, max_queue_size=2, bit_rate=2000000):
+        super().__init__(target_width, max_queue_size)
+        self.bit_rate = bit_rate
+        self._recorder = None
+        # 设备分辨率不会变化，第一次录制前查询一次后缓存
+        self._device_w = None
+        self._device_h = None
+        self._target_h = None
+        self._frames = 0
+    
+    def run(self):
+        failures = 0
+        while self.running:
+            self._frames = 0
+            try:
+                self._record()
+            except Exception as e:
+                time.sleep(0.5)
+            finally:
+                self._stop_recorder()
+            # 录满180秒正常结束的一段有画面，不算失败
+            failures = 0 if self._frames else failures + 1
+            if failures >= H264_MAX_FAILURES:
+                print("screenrecord 不可用，改用 screencap 截图")
+                ScreenCaptureThread.run(self)
+                return
+    
+    def _query_device_size(self):
+        """查询一次设备分辨率并计算录制尺寸"""
+        result = subprocess.run(
+            [ADB_PATH, "shell", "wm", "size"],
+            capture_output=True, text=True, timeout=2
+        )
+        # 设置过 Override size 时以它为准（screenrecord 录的是实际显示尺寸）
+        sizes = dict(re.findall(r"(Physical|Override) size: (\d+x\d+)", result.stdout))
+        size_str = sizes.get("Override") or sizes.get("Physical")
+        if size_str is None:
+            raise RuntimeError("无法获取设备分辨率")
+        self._device_w, self._device_h = map(int, size_str.split("x"))
+        # 编码器要求宽高为16的倍数
+        width = self.target_width // 16 * 16
+        self._target_h = max(16, int(self._device_h * width / self._device_w) // 16 * 16)
+    
+    def _record(self):
+        """
+        录制并解码一段视频流，解码出的帧数记在 _frames 中。
+        screenrecord 单次最长180秒，结束后由 run 重新启动
+        """
+        if self._target_h is None:
+            self._query_device_size()
+        width = self.target_width // 16 * 16
+        height = self._target_h
+        
+        self._recorder = subprocess.Popen(
+            [ADB_PATH, "exec-out", "screenrecord", "--output-format=h264",
+             f"--size={width}x{height}", f"--bit-rate={self.bit_rate}", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        # 关闭探测缓冲，收到一帧就解码一帧，降低延迟
+        container = av.open(self._recorder.stdout, format="h264",
+                            options={"probesize": "32", "fflags": "nobuffer", "flags": "low_delay"})
+        try:
+            for frame in container.decode(video=0):
+                if not self.running:
+                    break
+                self._put_frame(frame.to_ndarray(format="bgr24"))
+                self._frames += 1
+        finally:
+            container.close()
+    
+    def _stop_recorder(self):
+        """结束 screenrecord 进程"""
+        if self._recorder is not None:
+            try:
+                self._recorder.kill()
+                self._recorder.wait(timeout=1)
+            except Exception:
+                pass
+            self._recorder = None
+    
+    def stop(self):
+        """停止线程"""
+        super().stop()
+        self._stop_recorder()
 
 def display_optimized_window(target_width=480, target_fps=15):
     """显示优化后的窗口"""
     cv2.namedWindow("Phone Screen", cv2.WINDOW_NORMAL)
     cv2.resizeWindow("Phone Screen", target_width, int(target_width * 0.6))
-    capture_thread = ScreenCaptureThread(target_width=target_width)
+    # 安装了 PyAV 时使用 H.264 视频流，否则逐帧 screencap
+    thread_class = H264CaptureThread if av is not None else ScreenCaptureThread
+    capture_thread = thread_class(target_width=target_width)
     capture_thread.start()
     
     frame_count = 0
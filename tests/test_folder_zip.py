@@ -0,0 +1,54 @@
+"""文件夹打包下载 write_folder_zip 的测试"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import filepasser
+
+
+class FolderZipTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        self.folder = base / 'shared' / 'd'
+        self.folder.mkdir(parents=True)
+        (self.folder / 'a.txt').write_bytes(b'inside')
+        (base / 'shared' / 'outside.txt').write_bytes(b'secret')
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _zip(self):
+        out = io.BytesIO()
+        filepasser.write_folder_zip(out, self.folder)
+        out.seek(0)
+        return zipfile.ZipFile(out)
+    
+    @unittest.skipUnless(hasattr(os, 'symlink'), '需要符号链接支持')
+    def test_symlinks_are_skipped(self):
+        try:
+            os.symlink('../outside.txt', self.folder / 'link.txt')
+            os.symlink('missing.txt', self.folder / 'dangling.txt')
+        except OSError:
+            self.skipTest('无法创建符号链接')
+        with self._zip() as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), ['d/a.txt'])
+            self.assertEqual(archive.read('d/a.txt'), b'inside')
+    
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), '需要命名管道支持')
+    def test_fifo_is_skipped(self):
+        os.mkfifo(self.folder / 'pipe')
+        with self._zip() as archive:
+            self.assertEqual(archive.namelist(), ['d/a.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
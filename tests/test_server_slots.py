@@ -0,0 +1,145 @@
+"""ThreadedFileServer 处理名额（并发请求上限）的测试"""
+import http.client
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import filepasser
+
+
+class ServerSlotsTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        
+        class Handler(filepasser.FileTransferServer):
+            base_dir = base
+            uploads_dir = base / 'uploads'
+            shared_dir = base / 'shared'
+            downloads_dir = base / 'downloads'
+            
+            def log_message(self, format, *args):
+                pass
+        
+        Handler.uploads_dir.mkdir()
+        Handler.shared_dir.mkdir()
+        self.server = filepasser.ThreadedFileServer(('127.0.0.1', 0), Handler)
+        self.server._slots = threading.BoundedSemaphore(1)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+    
+    def _connect(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+    
+    def test_idle_keepalive_connection_releases_slot(self):
+        idle = self._connect()
+        idle.request('GET', '/api/files')
+        response = idle.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('Connection'), 'close')
+        
+        # 第一个连接仍然打开，但已经没有进行中的请求，唯一的名额应该可用
+        other = self._connect()
+        other.request('GET', '/api/files')
+        self.assertEqual(other.getresponse().status, 200)
+        
+        idle.request('GET', '/api/files')
+        self.assertEqual(idle.getresponse().status, 200)
+        idle.close()
+        other.close()
+    
+    def _raw_request(self, request):
+        """用原始套接字发送请求，返回服务器关闭连接前发来的全部数据"""
+        with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+            sock.sendall(request)
+            chunks = []
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    return b''.join(chunks)
+                chunks.append(data)
+    
+    def test_connection_close_is_honoured(self):
+        # 服务器不关闭连接时 recv 会等到超时抛出异常
+        reply = self._raw_request(b'GET /api/files HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+        self.assertIn(b'Connection: close', reply)
+        reply = self._raw_request(b'GET /api/files HTTP/1.0\r\n\r\n')
+        self.assertTrue(reply.startswith(b'HTTP/1.1 200'))
+        self.assertNotIn(b'keep-alive', reply)
+    
+    def test_busy_slots_reject_with_503(self):
+        original = filepasser.SLOT_WAIT_TIMEOUT
+        filepasser.SLOT_WAIT_TIMEOUT = 0.2
+        self.server._slots.acquire()
+        try:
+            conn = self._connect()
+            conn.request('GET', '/api/files')
+            response = conn.getresponse()
+            self.assertEqual(response.status, 503)
+            conn.close()
+        finally:
+            self.server._slots.release()
+            filepasser.SLOT_WAIT_TIMEOUT = original
+        
+        # 名额归还后可以正常处理
+        conn = self._connect()
+        conn.request('GET', '/api/files')
+        self.assertEqual(conn.getresponse().status, 200)
+        conn.close()
+    
+    def test_accept_loop_not_blocked_when_slots_busy(self):
+        original = filepasser.SLOT_WAIT_TIMEOUT
+        filepasser.SLOT_WAIT_TIMEOUT = 0.5
+        self.server._slots.acquire()
+        try:
+            # 名额被占用时新连接仍然会被接受，并由各自的线程返回503
+            conns = [self._connect() for _ in range(3)]
+            for conn in conns:
+                conn.request('GET', '/api/files')
+            for conn in conns:
+                self.assertEqual(conn.getresponse().status, 503)
+                conn.close()
+        finally:
+            self.server._slots.release()
+            filepasser.SLOT_WAIT_TIMEOUT = original
+    
+    def test_event_stream_does_not_hold_slot(self):
+        events = self._connect()
+        events.request('GET', '/api/events')
+        stream = events.getresponse()
+        self.assertEqual(stream.status, 200)
+        self.assertEqual(stream.fp.readline(), b'retry: 3000\n')
+        
+        conn = self._connect()
+        conn.request('GET', '/api/files')
+        self.assertEqual(conn.getresponse().status, 200)
+        conn.close()
+        events.close()
+    
+    def test_event_subscribers_are_capped(self):
+        original = filepasser.MAX_EVENT_SUBSCRIBERS
+        filepasser.MAX_EVENT_SUBSCRIBERS = len(filepasser._EVENT_SUBSCRIBERS)
+        try:
+            conn = self._connect()
+            conn.request('GET', '/api/events')
+            self.assertEqual(conn.getresponse().status, 503)
+            conn.close()
+        finally:
+            filepasser.MAX_EVENT_SUBSCRIBERS = original
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
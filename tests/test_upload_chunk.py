@@ -0,0 +1,97 @@
+"""分块上传接口 /api/upload_chunk 的测试"""
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import filepasser
+
+
+class UploadChunkTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        
+        class Handler(filepasser.FileTransferServer):
+            base_dir = base
+            uploads_dir = base / 'uploads'
+            shared_dir = base / 'shared'
+            downloads_dir = base / 'downloads'
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.handler = Handler
+        Handler.uploads_dir.mkdir()
+        Handler.shared_dir.mkdir()
+        self.server = filepasser.ThreadedFileServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+    
+    def _put(self, upload_id, name, data, offset, length, total=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=5)
+        query = urllib.parse.urlencode({
+            'id': upload_id, 'name': name, 'offset': offset,
+            'total': len(data) if total is None else total
+        })
+        conn.request('POST', '/api/upload_chunk?' + query, data[offset:offset + length])
+        response = conn.getresponse()
+        result = (response.status, json.loads(response.read()))
+        conn.close()
+        return result
+    
+    def test_same_name_and_size_uploads_do_not_mix(self):
+        first, second = os.urandom(3000), os.urandom(3000)
+        self._put('upload-one', 'same.bin', first, 0, 1500)
+        self._put('upload-two', 'same.bin', second, 0, 1500)
+        self._put('upload-two', 'same.bin', second, 1500, 1500)
+        self.assertEqual((self.handler.shared_dir / 'same.bin').read_bytes(), second)
+        
+        status, result = self._put('upload-one', 'same.bin', first, 1500, 1500)
+        self.assertTrue(result['complete'])
+        self.assertEqual((self.handler.shared_dir / 'same.bin').read_bytes(), first)
+    
+    def test_overlapping_chunks_with_hole_are_not_published(self):
+        data = os.urandom(3000)
+        # 0-1000、0-1500、500-1500 长度之和达到3000，但 1500-3000 还没有收到
+        for offset, length in ((0, 1000), (0, 1500), (500, 1000)):
+            status, result = self._put('upload-hole', 'hole.bin', data, offset, length)
+            self.assertFalse(result['complete'])
+        self.assertFalse((self.handler.shared_dir / 'hole.bin').exists())
+        
+        status, result = self._put('upload-hole', 'hole.bin', data, 1500, 1500)
+        self.assertTrue(result['complete'])
+        self.assertEqual((self.handler.shared_dir / 'hole.bin').read_bytes(), data)
+    
+    def test_chunk_past_total_is_rejected(self):
+        status, result = self._put('upload-past', 'past.bin', b'x' * 20, 10, 10, total=15)
+        self.assertEqual(status, 400)
+    
+    def test_stale_uploads_are_removed(self):
+        self._put('upload-stale', 'stale.bin', b'x' * 100, 0, 10)
+        self.assertTrue((self.handler.uploads_dir / 'upload-stale.chunks').exists())
+        
+        original = filepasser.CHUNKED_UPLOAD_TIMEOUT
+        filepasser.CHUNKED_UPLOAD_TIMEOUT = 0
+        try:
+            self._put('upload-next', 'next.bin', b'', 0, 0)
+        finally:
+            filepasser.CHUNKED_UPLOAD_TIMEOUT = original
+        self.assertFalse((self.handler.uploads_dir / 'upload-stale.chunks').exists())
+        self.assertNotIn('upload-stale', filepasser._CHUNKED_UPLOADS)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file